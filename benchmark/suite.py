@@ -0,0 +1,198 @@
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from timeit import default_timer
+
+from benchmark import workloads
+from benchmark.vm import counting_loop, env_for, run_small_step
+from model import big_step, small_step, vm
+
+
+def plain(env):
+    # to_python and to_function run on plain python values
+    return {name: value.value for name, value in env.items()}
+
+
+def python_function(statement):
+    # the source of a top level while is a script writing the global env, everything else is a lambda
+    source = statement.to_python()
+    if not isinstance(statement, big_step.While):
+        run_lambda = eval(source)
+        return lambda env: run_lambda(dict(env))
+    code = compile(source % 'start', '<to_python>', 'exec')
+
+    def run_script(env):
+        namespace = {'start': dict(env)}
+        exec(code, namespace)
+        return namespace['env']
+    return run_script
+
+
+def program_runs(build, build_env, size):
+    # the same program for every evaluator, prepared up front so that only running it is measured
+    big_program = build(big_step, size)
+    small_program = build(small_step, size)
+    big_env = build_env(big_step, size)
+    small_env = build_env(small_step, size)
+    runs = [
+        ('big_step', lambda: big_program.evaluate(big_env)),
+        ('small_step', lambda: run_small_step(small_program, small_env)),
+    ]
+    # deep trees may be too deep for the python compiler, the error is reported instead
+    for engine, prepare in (('to_python', python_function), ('to_function', lambda program: program.to_function()),
+                            ('vm', lambda program: vm.compile(program).run)):
+        try:
+            function = prepare(big_program)
+            env = plain(big_env) if engine != 'vm' else big_env
+            runs.append((engine, lambda function=function, env=env: function(env)))
+        except (RecursionError, SyntaxError, MemoryError) as error:
+            runs.append((engine, error))
+    return runs
+
+
+def matcher_runs(states, length):
+    string = workloads.random_string(length)
+    dfa = workloads.modulo_counter(states)
+    compiled = dfa.compile()
+    nfa = workloads.nth_from_end(min(states, 16))
+    bitset = nfa.to_bitset()
+    lazy = nfa.to_dfa(lazy=True)
+    return [
+        ('dfa', lambda: dfa.accept(string)),
+        ('compiled_dfa', lambda: compiled.accept(string)),
+        ('nfa', lambda: nfa.accept(string)),
+        ('bitset_nfa', lambda: bitset.accept(string)),
+        ('lazy_dfa', lambda: lazy.accept(string)),
+    ]
+
+
+def workloads_for(scale):
+    # (workload, size, runs) for every workload, scale grows or shrinks all sizes together
+    def size(base):
+        return max(1, int(base * scale))
+
+    yield 'deep_arithmetic', size(150), program_runs(
+        workloads.deep_arithmetic, lambda module, _: workloads.arithmetic_env(module), size(150))
+    yield 'counting_loop', size(2000), program_runs(
+        counting_loop, lambda module, _: env_for(module), size(2000))
+    yield 'wide_environment', size(500), program_runs(
+        workloads.wide_environment, workloads.wide_env, size(500))
+    yield 'matchers', size(256), matcher_runs(size(256), size(20000))
+
+
+def measure(function, repeat):
+    times = []
+    for _ in range(repeat):
+        start = default_timer()
+        function()
+        times.append(default_timer() - start)
+
+    # one more run under tracemalloc, it slows everything down so it is not timed
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    start_size, _ = tracemalloc.get_traced_memory()
+    result = function()
+    current_size, peak_size = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    del result
+
+    # allocated is what the run left behind, its result included, peak is the high water mark during the run
+    statistics = after.compare_to(before, 'filename')
+    return {
+        'seconds': min(times),
+        'mean_seconds': sum(times) / len(times),
+        'peak_bytes': peak_size - start_size,
+        'allocated_bytes': current_size - start_size,
+        'allocated_blocks': sum(statistic.count_diff for statistic in statistics),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(scale=1.0, repeat=3, only=None):
+    results = []
+    for workload, size, runs in workloads_for(scale):
+        for engine, function in runs:
+            if only and not any(name in (workload, engine) for name in only):
+                continue
+            result = {'workload': workload, 'size': size, 'engine': engine}
+            if isinstance(function, Exception):
+                result['error'] = f'{type(function).__name__}: {function}'
+            else:
+                result.update(measure(function, repeat))
+            results.append(result)
+    return {
+        'commit': git_commit(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'scale': scale,
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+def compare(baseline, current, threshold):
+    # the ratio of the best time of every run found in both reports, slower than the threshold is a regression
+    old = {(result['workload'], result['size'], result['engine']): result
+           for result in baseline['results'] if 'error' not in result}
+    rows = []
+    for result in current['results']:
+        key = (result['workload'], result['size'], result['engine'])
+        if 'error' in result or key not in old:
+            continue
+        ratio = result['seconds'] / old[key]['seconds']
+        rows.append((key, ratio, ratio > threshold))
+    return rows
+
+
+def report(results):
+    for result in results['results']:
+        name = f'{result["workload"]}[{result["size"]}] {result["engine"]}'
+        if 'error' in result:
+            print(f'{name:<40}{result["error"]}')
+        else:
+            print(f'{name:<40}{result["seconds"] * 1000:>10.2f} ms{result["peak_bytes"] / 1024:>12.1f} KiB peak'
+                  f'{result["allocated_blocks"]:>10} blocks')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='time every evaluator and matcher on generated workloads')
+    parser.add_argument('--scale', type=float, default=1.0, help='multiply every workload size')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--only', nargs='*', help='only run these workloads or engines')
+    parser.add_argument('--output', help='save the results as json')
+    parser.add_argument('--compare', help='a json file of an earlier run to compare with')
+    parser.add_argument('--threshold', type=float, default=1.1, help='the slowdown counted as a regression')
+    args = parser.parse_args(argv)
+
+    results = run(args.scale, args.repeat, args.only)
+    report(results)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        print(f'\ncompared with {baseline.get("commit")}')
+        regressions = 0
+        for (workload, size, engine), ratio, regression in compare(baseline, results, args.threshold):
+            regressions += regression
+            print(f'{workload}[{size}] {engine:<28}{ratio:>8.2f}x{"  regression" if regression else ""}')
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
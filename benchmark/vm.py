@@ -0,0 +1,66 @@
+import argparse
+from timeit import default_timer
+
+from model import big_step, small_step, vm
+
+
+def counting_loop(module, iterations):
+    # x counts up to the limit while y accumulates x * 2 + 1
+    return module.While(
+        module.LessThan(module.Variable('x'), module.Number(iterations)),
+        module.Sequence(
+            module.Assign('y', module.Add(module.Variable('y'),
+                                          module.Add(module.Multiply(module.Variable('x'), module.Number(2)),
+                                                     module.Number(1)))),
+            module.Assign('x', module.Add(module.Variable('x'), module.Number(1)))
+        )
+    )
+
+
+def env_for(module):
+    return {'x': module.Number(0), 'y': module.Number(0)}
+
+
+def run_small_step(statement, env):
+    machine = small_step.StatementMachine(statement, env)
+    # ask the zipper, plugging the whole statement back together on every step would dominate the run
+    while machine.zipper.reducible:
+        machine.step()
+    return machine.env
+
+
+def measure(function, repeat):
+    best = None
+    for _ in range(repeat):
+        start = default_timer()
+        function()
+        elapsed = default_timer() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='compare the bytecode vm with the big-step and small-step evaluators')
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    big_program = counting_loop(big_step, args.iterations)
+    small_program = counting_loop(small_step, args.iterations)
+    bytecode = vm.compile(big_program)
+    runs = [
+        ('big_step', lambda: big_program.evaluate(env_for(big_step))),
+        ('small_step', lambda: run_small_step(small_program, env_for(small_step))),
+        ('vm', lambda: bytecode.run(env_for(big_step))),
+    ]
+
+    results = {}
+    for name, function in runs:
+        results[name] = measure(function, args.repeat)
+    for name, elapsed in results.items():
+        print(f'{name:<12}{elapsed * 1000:>10.2f} ms{args.iterations / elapsed:>14.0f} iterations/s'
+              f'{elapsed / results["vm"]:>10.1f}x vm')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+import random
+
+from model.state_machine import FARule, DFARuleBook, DFAFactory, NFARuleBook, NFAFactory
+
+
+def deep_arithmetic(module, depth):
+    # x = ((1 + 2 * 1) + 3 * 2) + ..., a left deep tree with a multiplication in every level
+    expression = module.Number(1)
+    for level in range(depth):
+        expression = module.Add(expression, module.Multiply(module.Number(level + 2), module.Variable('x')))
+    return module.Assign('x', expression)
+
+
+def arithmetic_env(module):
+    return {'x': module.Number(1)}
+
+
+def wide_environment(module, width):
+    # every variable is read once, the sum is built up in a single accumulator
+    statement = module.Assign('total', module.Number(0))
+    for index in range(width):
+        statement = module.Sequence(
+            statement,
+            module.Assign('total', module.Add(module.Variable('total'), module.Variable(f'v{index}')))
+        )
+    return statement
+
+
+def wide_env(module, width):
+    return {f'v{index}': module.Number(index) for index in range(width)}
+
+
+def modulo_counter(states):
+    # accept strings whose number of a is a multiple of the number of states, b loops in place
+    rules = []
+    for state in range(states):
+        rules.append(FARule(state, 'a', (state + 1) % states))
+        rules.append(FARule(state, 'b', state))
+    return DFAFactory(0, [0], DFARuleBook(rules))
+
+
+def nth_from_end(n):
+    # accept strings with an a at the nth position from the end, its dfa needs 2 ** n states
+    rules = [FARule(0, 'a', 0), FARule(0, 'b', 0), FARule(0, 'a', 1)]
+    for state in range(1, n):
+        rules.append(FARule(state, 'a', state + 1))
+        rules.append(FARule(state, 'b', state + 1))
+    return NFAFactory(0, [n], NFARuleBook(rules))
+
+
+def random_string(length, alphabet='ab', seed=0):
+    # the same string for the same arguments, so that runs stay comparable
+    generator = random.Random(seed)
+    return ''.join(generator.choice(alphabet) for _ in range(length))
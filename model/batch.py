@@ -0,0 +1,146 @@
+import importlib
+import os
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from time import perf_counter
+
+from model import big_step
+from model.parser import parse
+from model.serialize import dumps, loads
+
+
+# how many steps run between two looks at the clock
+CLOCK_INTERVAL = 1024
+
+
+class Result:
+    __slots__ = ('index', 'env', 'steps', 'status', 'error', 'seconds')
+
+    def __init__(self, index, env, steps, status, error=None, seconds=0.0):
+        # the position of the program in the batch, status is done, steps, timeout or error
+        self.index = index
+        self.env = env
+        self.steps = steps
+        self.status = status
+        self.error = error
+        self.seconds = seconds
+
+    def __repr__(self):
+        return f'<#{self.index} {self.status} after {self.steps} steps: {self.error or self.env}>'
+
+
+def plain(env):
+    return {name: value.value for name, value in env.items()}
+
+
+def wrap(module, env):
+    return {name: module.Boolean(value) if isinstance(value, bool) else module.Number(value)
+            for name, value in env.items()}
+
+
+def run_big_step(statement, env, max_steps, deadline):
+    # the same loop as Statement.evaluate, counting every executed statement against the budgets
+    stack = [statement]
+    steps = 0
+    while stack:
+        if max_steps is not None and steps >= max_steps:
+            return env, steps, 'steps'
+        if deadline is not None and steps % CLOCK_INTERVAL == 0 and perf_counter() > deadline:
+            return env, steps, 'timeout'
+        env = stack.pop().execute(env, stack, big_step.evaluate_expression)
+        steps += 1
+    return env, steps, 'done'
+
+
+def run_small_step(module, statement, env, max_steps, deadline):
+    # fast forward in slices, so that the clock is looked at between them
+    machine = module.StatementMachine(statement, env)
+    steps = 0
+    while True:
+        limit = CLOCK_INTERVAL if max_steps is None else min(CLOCK_INTERVAL, max_steps - steps)
+        statement, env, taken = machine.run_to_completion(limit)
+        steps += taken
+        if not statement.reducible:
+            return env, steps, 'done'
+        if max_steps is not None and steps >= max_steps:
+            return env, steps, 'steps'
+        if deadline is not None and perf_counter() > deadline:
+            return env, steps, 'timeout'
+
+
+def run_chunk(module_name, jobs, max_steps, timeout):
+    # runs in a worker, programs come in as source text or node tables and envs as plain values,
+    # and go back the same way
+    module = importlib.import_module(module_name)
+    results = []
+    for index, source, env, error in jobs:
+        if error is not None:
+            # the program could not even be sent
+            results.append(Result(index, None, 0, 'error', error))
+            continue
+        start = perf_counter()
+        deadline = None if timeout is None else start + timeout
+        try:
+            statement = parse(source, module) if isinstance(source, str) else loads(source, module)
+            env = wrap(module, env)
+            if module is big_step:
+                env, steps, status = run_big_step(statement, env, max_steps, deadline)
+            else:
+                env, steps, status = run_small_step(module, statement, env, max_steps, deadline)
+            results.append(Result(index, plain(env), steps, status, seconds=perf_counter() - start))
+        except Exception as error:
+            results.append(Result(index, None, 0, 'error', f'{type(error).__name__}: {error}',
+                                  perf_counter() - start))
+    return results
+
+
+class BatchRunner:
+    def __init__(self, module=big_step, workers=None, chunk_size=64, max_steps=None, timeout=None):
+        self.module = module
+        self.workers = workers
+        # programs are sent in chunks, so that one round trip to a worker carries many of them
+        self.chunk_size = chunk_size
+        # per program budgets, in executed statements or reduction steps, and in seconds
+        self.max_steps = max_steps
+        self.timeout = timeout
+
+    def jobs(self, programs):
+        # (index, source, env, error), programs may already be source text, nodes go as node tables
+        # which hold any number, a program that can't be sent becomes an error of its own
+        for index, (program, env) in enumerate(programs):
+            try:
+                source = program if isinstance(program, str) else dumps(program)
+                yield index, source, plain(env or {}), None
+            except Exception as error:
+                yield index, None, None, f'{type(error).__name__}: {error}'
+
+    def chunks(self, programs):
+        chunk = []
+        for job in self.jobs(programs):
+            chunk.append(job)
+            if len(chunk) == self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def run(self, programs):
+        # yield results as the chunks come back, at most two chunks per worker are waiting at a time
+        # so that a long or endless stream of programs is never read ahead all at once
+        workers = self.workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(workers) as executor:
+            in_flight = 2 * workers
+            chunks = self.chunks(programs)
+            pending = set()
+            while True:
+                for chunk in chunks:
+                    pending.add(executor.submit(run_chunk, self.module.__name__, chunk, self.max_steps, self.timeout))
+                    if len(pending) >= in_flight:
+                        break
+                if not pending:
+                    return
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    for result in future.result():
+                        if result.env is not None:
+                            result.env = wrap(self.module, result.env)
+                        yield result
@@ -1,11 +1,21 @@
-from copy import deepcopy
+from collections import OrderedDict
+from operator import itemgetter
 
+from model.environment import Environment
+from model.node import Node, walk
 
-class Expression:
-    pass
+
+class Expression(Node):
+    __slots__ = ()
+
+    def to_function(self):
+        # compile once into nested closures over plain python values
+        return self.to_closure()
 
 
 class Number(Expression):
+    __slots__ = ('value',)
+
     def __init__(self, value):
         self.value = value
 
@@ -19,8 +29,14 @@ class Number(Expression):
     def to_python(self):
         return f'lambda env: {self.value}'
 
+    def to_closure(self):
+        value = self.value
+        return lambda env: value
+
 
 class Boolean(Expression):
+    __slots__ = ('value',)
+
     def __init__(self, value):
         self.value = value
 
@@ -33,8 +49,14 @@ class Boolean(Expression):
     def to_python(self):
         return f'lambda env: {self.value}'
 
+    def to_closure(self):
+        value = self.value
+        return lambda env: value
+
 
 class Variable(Expression):
+    __slots__ = ('name',)
+
     def __init__(self, name):
         self.name = name
 
@@ -47,8 +69,13 @@ class Variable(Expression):
     def to_python(self):
         return f'lambda env: env["{self.name}"]'
 
+    def to_closure(self):
+        return itemgetter(self.name)
+
 
 class Add(Expression):
+    __slots__ = ('left', 'right')
+
     def __init__(self, left, right):
         self.left = left
         self.right = right
@@ -57,13 +84,27 @@ class Add(Expression):
         return f'<{self.left} + {self.right}>'
 
     def evaluate(self, env):
-        return Number(self.left.evaluate(env).value + self.right.evaluate(env).value)
+        return self.combine(self.left.evaluate(env), self.right.evaluate(env))
+
+    def combine(self, left, right):
+        return Number(left.value + right.value)
 
     def to_python(self):
         return f'lambda env: ({self.left.to_python()})(env) + ({self.right.to_python()})(env)'
 
+    def to_closure(self):
+        left = self.left.to_closure()
+        if isinstance(self.right, Number):
+            # save a call for the constant operand
+            value = self.right.value
+            return lambda env: left(env) + value
+        right = self.right.to_closure()
+        return lambda env: left(env) + right(env)
+
 
 class Multiply(Expression):
+    __slots__ = ('left', 'right')
+
     def __init__(self, left, right):
         self.left = left
         self.right = right
@@ -72,13 +113,26 @@ class Multiply(Expression):
         return f'<{self.left} * {self.right}>'
 
     def evaluate(self, env):
-        return Number(self.left.evaluate(env).value * self.right.evaluate(env).value)
+        return self.combine(self.left.evaluate(env), self.right.evaluate(env))
+
+    def combine(self, left, right):
+        return Number(left.value * right.value)
 
     def to_python(self):
         return f'lambda env: ({self.left.to_python()})(env) * ({self.right.to_python()})(env)'
 
+    def to_closure(self):
+        left = self.left.to_closure()
+        if isinstance(self.right, Number):
+            value = self.right.value
+            return lambda env: left(env) * value
+        right = self.right.to_closure()
+        return lambda env: left(env) * right(env)
+
 
 class LessThan(Expression):
+    __slots__ = ('left', 'right')
+
     def __init__(self, left, right):
         self.left = left
         self.right = right
@@ -87,34 +141,65 @@ class LessThan(Expression):
         return f'<{self.left} < {self.right}>'
 
     def evaluate(self, env):
-        left_value = self.left.evaluate(env).value
-        right_value = self.right.evaluate(env).value
-        return Boolean(left_value < right_value)
+        return self.combine(self.left.evaluate(env), self.right.evaluate(env))
+
+    def combine(self, left, right):
+        return Boolean(left.value < right.value)
 
     def to_python(self):
         return f'lambda env: ({self.left.to_python()})(env) < ({self.right.to_python()})(env)'
 
+    def to_closure(self):
+        left = self.left.to_closure()
+        if isinstance(self.right, Number):
+            value = self.right.value
+            return lambda env: left(env) < value
+        right = self.right.to_closure()
+        return lambda env: left(env) < right(env)
+
+
+class Statement(Node):
+    __slots__ = ()
+
+    def evaluate(self, env, cache=None):
+        # run with an explicit stack of pending statements, so that long loops
+        # and deep sequences never grow the python stack
+        evaluate = evaluate_expression if cache is None else cache.evaluate
+        stack = [self]
+        while stack:
+            env = stack.pop().execute(env, stack, evaluate)
+        return env
 
-class Statement:
-    pass
+    def to_function(self):
+        # compile once, the function runs on a copy of any env of plain python values,
+        # the closures below update that copy in place
+        run = self.to_closure()
+
+        def function(env):
+            env = dict(env)
+            run(env)
+            return env
+        return function
 
 
 class DoNothing(Statement):
+    __slots__ = ()
 
     def __repr__(self):
         return '<do-nothing>'
 
-    def __eq__(self, other):
-        return isinstance(other, DoNothing)
-
-    def evaluate(self, env):
+    def execute(self, env, stack, evaluate):
         return env
 
     def to_python(self):
         return 'lambda env: env'
 
+    def to_closure(self):
+        return lambda env: None
+
 
 class Assign(Statement):
+    __slots__ = ('name', 'expression')
 
     def __init__(self, name, expression):
         self.name = name
@@ -123,16 +208,25 @@ class Assign(Statement):
     def __repr__(self):
         return f'<{self.name} = {self.expression}>'
 
-    def evaluate(self, env):
-        new_env = deepcopy(env)
-        new_env[self.name] = self.expression.evaluate(env)
-        return new_env
+    def execute(self, env, stack, evaluate):
+        # the old env is left untouched, the new one shares everything else with it
+        return Environment.wrap(env).set(self.name, evaluate(self.expression, env))
 
     def to_python(self):
         return f'lambda env: dict([pair for pair in env.items() if pair[0] != "{self.name}"] + [("{self.name}", ({self.expression.to_python()})(env))])'
 
+    def to_closure(self):
+        name = self.name
+        expression = self.expression.to_closure()
+
+        def assign(env):
+            env[name] = expression(env)
+        return assign
+
 
 class IF(Statement):
+    __slots__ = ('condition', 'consequence', 'alternative')
+
     def __init__(self, condition, consequence, alternative):
         self.condition = condition
         self.consequence = consequence
@@ -143,17 +237,31 @@ class IF(Statement):
             f'{self.consequence} ' \
             f'else: {self.alternative}'
 
-    def evaluate(self, env):
-        if self.condition.evaluate(env).value is True:
-            return self.consequence.evaluate(env)
+    def execute(self, env, stack, evaluate):
+        if evaluate(self.condition, env).value is True:
+            stack.append(self.consequence)
         else:
-            return self.alternative.evaluate(env)
+            stack.append(self.alternative)
+        return env
 
     def to_python(self):
         return f'lambda env: ({self.consequence.to_python()})(env) if ({self.condition.to_python()})(env) else ({self.alternative.to_python()})(env)'
 
+    def to_closure(self):
+        condition = self.condition.to_closure()
+        consequence = self.consequence.to_closure()
+        alternative = self.alternative.to_closure()
+
+        def if_else(env):
+            if condition(env) is True:
+                consequence(env)
+            else:
+                alternative(env)
+        return if_else
+
 
 class Sequence(Statement):
+    __slots__ = ('first', 'second')
 
     def __init__(self, first, second):
         self.first = first
@@ -162,16 +270,36 @@ class Sequence(Statement):
     def __repr__(self):
         return f'<{self.first}; {self.second}>'
 
-    def evaluate(self, env):
-        new_env = self.first.evaluate(env)
-        new_env = self.second.evaluate(new_env)
-        return new_env
+    def execute(self, env, stack, evaluate):
+        # the first statement is on top, so it runs before the second
+        stack.append(self.second)
+        stack.append(self.first)
+        return env
 
     def to_python(self):
         return f'lambda env: ({self.second.to_python()})(({self.first.to_python()})(env))'
 
+    def to_closure(self):
+        # flatten nested sequences into one loop over their statements
+        statements = []
+        pending = [self]
+        while pending:
+            statement = pending.pop()
+            if isinstance(statement, Sequence):
+                pending.append(statement.second)
+                pending.append(statement.first)
+            else:
+                statements.append(statement.to_closure())
+        statements = tuple(statements)
+
+        def sequence(env):
+            for statement in statements:
+                statement(env)
+        return sequence
+
 
 class While(Statement):
+    __slots__ = ('condition', 'body')
 
     def __init__(self, condition, body):
         self.condition = condition
@@ -180,13 +308,12 @@ class While(Statement):
     def __repr__(self):
         return f'<while {self.condition}: {self.body}>'
 
-    def evaluate(self, env):
-        if self.condition.evaluate(env).value is True:
-            # just run and change the env, and then do it again
-            new_env = self.body.evaluate(env)
-            return self.evaluate(new_env)
-        else:
-            return env
+    def execute(self, env, stack, evaluate):
+        if evaluate(self.condition, env).value is True:
+            # just run the body, and then come back to check again
+            stack.append(self)
+            stack.append(self.body)
+        return env
 
     def to_python(self):
         return f'def while_f(env):' \
@@ -196,13 +323,99 @@ class While(Statement):
             f'\n\rglobal env ' \
             f'\n\renv = while_f(%s)'
 
+    def to_closure(self):
+        condition = self.condition.to_closure()
+        body = self.body.to_closure()
+
+        def while_loop(env):
+            while condition(env) is True:
+                body(env)
+        return while_loop
+
+
+def evaluate_expression(expression, env):
+    return expression.evaluate(env)
+
+
+# how often an expression may miss the cache in a row before it is no longer cached
+MISS_LIMIT = 16
+
+
+class EvaluationCache:
+    def __init__(self, maxsize=1024):
+        # results are keyed on the expression and the values of just the variables it reads,
+        # so a loop invariant expression is only computed once per loop
+        self.maxsize = maxsize
+        self.results = OrderedDict()
+        self.variables = {}
+        self.plans = {}
+        self.hits = 0
+        self.misses = 0
+
+    def free_variables(self, expression):
+        names = self.variables.get(expression)
+        if names is None:
+            names = tuple(sorted({node.name for node in walk(expression) if isinstance(node, Variable)}))
+            self.variables[expression] = names
+        return names
+
+    def plan(self, expression):
+        # the free variables of an expression worth caching and how often it missed in a row,
+        # no variables for the ones cheaper to evaluate than to look up: leaves and operators on two leaves,
+        # plans are found by id, which stays unique as long as the plan keeps its expression alive
+        plan = self.plans.get(id(expression))
+        if plan is None:
+            operators = (Add, Multiply, LessThan)
+            names = None
+            if isinstance(expression, operators) and \
+                    (isinstance(expression.left, operators) or isinstance(expression.right, operators)):
+                names = self.free_variables(expression)
+            plan = self.plans[id(expression)] = [expression, names, 0]
+        return plan
+
+    def evaluate(self, expression, env):
+        plan = self.plan(expression)
+        names = plan[1]
+        if names is None:
+            return expression.evaluate(env)
+        if plan[2] >= MISS_LIMIT:
+            # a loop variant expression only fills the cache, just its parts are still looked up
+            return expression.combine(self.evaluate(expression.left, env), self.evaluate(expression.right, env))
+
+        # the raw values of the variables, hashing result nodes would walk every one of them
+        values = [env[name] for name in names]
+        key = (id(expression), tuple([(type(value), value.value) for value in values]))
+        result = self.results.get(key)
+        if result is not None:
+            self.hits += 1
+            plan[2] = 0
+            self.results.move_to_end(key)
+            return result
+
+        self.misses += 1
+        plan[2] += 1
+        result = expression.combine(self.evaluate(expression.left, env), self.evaluate(expression.right, env))
+        self.results[key] = result
+        if len(self.results) > self.maxsize:
+            self.results.popitem(last=False)
+        return result
+
+    def run(self, node, env):
+        if isinstance(node, Statement):
+            return node.evaluate(env, self)
+        return self.evaluate(node, env)
+
 
 class Machine:
-    def __init__(self, statement, env=None):
+    def __init__(self, statement, env=None, cache=None):
         self.statement = statement
         if env is None:
             env = {}
         self.env = env
+        self.cache = cache
 
     def run(self):
-        print(self.statement.evaluate(self.env))
+        if self.cache is not None:
+            print(self.cache.run(self.statement, self.env))
+        else:
+            print(self.statement.evaluate(self.env))
@@ -0,0 +1,145 @@
+from collections.abc import Mapping
+
+
+BITS = 5
+MASK = (1 << BITS) - 1
+HASH_MASK = (1 << 64) - 1
+
+
+def bit_count(bitmap):
+    return bin(bitmap).count('1')
+
+
+class Leaf:
+    def __init__(self, key, hash_value, order, value):
+        self.key = key
+        self.hash_value = hash_value
+        # the insertion order, so that the environment prints like a dict
+        self.order = order
+        self.value = value
+
+
+class Collision:
+    def __init__(self, hash_value, leaves):
+        # leaves whose keys have exactly the same hash
+        self.hash_value = hash_value
+        self.leaves = leaves
+
+    def find(self, key):
+        for leaf in self.leaves:
+            if leaf.key == key:
+                return leaf
+
+    def set(self, leaf):
+        leaves = tuple(_leaf for _leaf in self.leaves if _leaf.key != leaf.key)
+        return Collision(self.hash_value, leaves + (leaf,))
+
+
+class Node:
+    def __init__(self, bitmap, children):
+        # children are leaves, collisions or nodes, only the slots marked in the bitmap are stored
+        self.bitmap = bitmap
+        self.children = children
+
+    def find(self, key, hash_value, shift):
+        node = self
+        while True:
+            bit = 1 << ((hash_value >> shift) & MASK)
+            if not node.bitmap & bit:
+                return None
+            child = node.children[bit_count(node.bitmap & (bit - 1))]
+            if isinstance(child, Node):
+                node = child
+                shift += BITS
+            elif isinstance(child, Leaf):
+                return child if child.key == key else None
+            else:
+                return child.find(key) if child.hash_value == hash_value else None
+
+    def set(self, leaf, shift):
+        # return a new node with the leaf inserted, sharing every untouched child
+        bit = 1 << ((leaf.hash_value >> shift) & MASK)
+        index = bit_count(self.bitmap & (bit - 1))
+        if not self.bitmap & bit:
+            return Node(self.bitmap | bit, self.children[:index] + (leaf,) + self.children[index:])
+
+        child = self.children[index]
+        if isinstance(child, Node):
+            child = child.set(leaf, shift + BITS)
+        elif isinstance(child, Leaf) and child.key == leaf.key:
+            child = leaf
+        elif child.hash_value == leaf.hash_value:
+            if isinstance(child, Leaf):
+                child = Collision(child.hash_value, (child, leaf))
+            else:
+                child = child.set(leaf)
+        else:
+            # two different hashes share this slot, push both one level down
+            child = Node(0, ()).set_child(child, shift + BITS).set(leaf, shift + BITS)
+        return Node(self.bitmap, self.children[:index] + (child,) + self.children[index + 1:])
+
+    def set_child(self, child, shift):
+        bit = 1 << ((child.hash_value >> shift) & MASK)
+        return Node(self.bitmap | bit, (child,))
+
+    def leaves(self):
+        for child in self.children:
+            if isinstance(child, Node):
+                yield from child.leaves()
+            elif isinstance(child, Leaf):
+                yield child
+            else:
+                yield from child.leaves
+
+
+EMPTY = Node(0, ())
+
+
+class Environment(Mapping):
+
+    def __init__(self, bindings=None):
+        # a persistent hash array mapped trie, every assignment returns a new environment
+        # which shares all untouched nodes with the old one
+        self.root = EMPTY
+        self.size = 0
+        if bindings is not None:
+            for name, value in bindings.items():
+                self.root, self.size = self.inserted(name, value)
+
+    @classmethod
+    def wrap(cls, env):
+        if isinstance(env, Environment):
+            return env
+        return cls(env)
+
+    def inserted(self, name, value):
+        hash_value = hash(name) & HASH_MASK
+        leaf = self.root.find(name, hash_value, 0)
+        if leaf is None:
+            return self.root.set(Leaf(name, hash_value, self.size, value), 0), self.size + 1
+        return self.root.set(Leaf(name, hash_value, leaf.order, value), 0), self.size
+
+    def set(self, name, value):
+        env = Environment()
+        env.root, env.size = self.inserted(name, value)
+        return env
+
+    def __getitem__(self, name):
+        leaf = self.root.find(name, hash(name) & HASH_MASK, 0)
+        if leaf is None:
+            raise KeyError(name)
+        return leaf.value
+
+    def __contains__(self, name):
+        return self.root.find(name, hash(name) & HASH_MASK, 0) is not None
+
+    def __iter__(self):
+        for leaf in sorted(self.root.leaves(), key=lambda leaf: leaf.order):
+            yield leaf.key
+
+    def __len__(self):
+        return self.size
+
+    def __repr__(self):
+        leaves = sorted(self.root.leaves(), key=lambda leaf: leaf.order)
+        return '{' + ', '.join(f'{leaf.key!r}: {leaf.value!r}' for leaf in leaves) + '}'
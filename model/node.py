@@ -0,0 +1,83 @@
+class Node:
+    # the fields of a node are the slots of its class, in the order of its constructor arguments
+    __slots__ = ('_hash',)
+
+    @property
+    def fields(self):
+        return tuple(getattr(self, name) for name in type(self).__slots__)
+
+    def replace(self, field, value):
+        # a copy of this node with one field changed
+        return type(self)(*[value if name == field else getattr(self, name) for name in type(self).__slots__])
+
+    def key(self):
+        # leaf values carry their type, so that <1> and <True> stay different nodes
+        return tuple(field if isinstance(field, Node) else (type(field), field) for field in self.fields)
+
+    def __eq__(self, other):
+        # compare with an explicit stack, deep trees must not hit the recursion limit
+        pending = [(self, other)]
+        while pending:
+            left, right = pending.pop()
+            if left is right:
+                continue
+            if type(left) is not type(right) or hash(left) != hash(right):
+                return False
+            for left_field, right_field in zip(left.key(), right.key()):
+                if isinstance(left_field, Node):
+                    pending.append((left_field, right_field))
+                elif left_field != right_field:
+                    return False
+        return True
+
+    def __hash__(self):
+        try:
+            return self._hash
+        except AttributeError:
+            pass
+        # hash the children first, so that every node only combines cached hashes
+        for node in walk(self, skip=lambda node: hasattr(node, '_hash')):
+            node._hash = hash((type(node), tuple(hash(field) for field in node.key())))
+        return self._hash
+
+
+def walk(node, skip=None):
+    # every distinct node of the tree, children before their parents,
+    # the subtrees of skipped nodes are left out
+    seen = set()
+    nodes = []
+    pending = [(node, False)]
+    while pending:
+        node, visited = pending.pop()
+        if visited:
+            nodes.append(node)
+        elif id(node) not in seen and (skip is None or not skip(node)):
+            seen.add(id(node))
+            pending.append((node, True))
+            pending.extend((field, False) for field in reversed(node.fields) if isinstance(field, Node))
+    return nodes
+
+
+class Interner:
+    def __init__(self):
+        # hash-consing table, structurally equal nodes share the first object seen
+        self.nodes = {}
+
+    def intern(self, node):
+        # rebuild the tree bottom up from interned children
+        interned = {}
+        for original in walk(node):
+            fields = tuple(interned[id(field)] if isinstance(field, Node) else field for field in original.fields)
+            rebuilt = original
+            if any(field is not _field for field, _field in zip(fields, original.fields)):
+                rebuilt = type(original)(*fields)
+            interned[id(original)] = self.nodes.setdefault(rebuilt, rebuilt)
+        return interned[id(node)]
+
+    def make(self, node_class, *fields):
+        # build a node from already interned children
+        node = node_class(*fields)
+        return self.nodes.setdefault(node, node)
+
+    def __len__(self):
+        return len(self.nodes)
@@ -0,0 +1,87 @@
+import sys
+
+from model.node import Node, walk
+
+
+class Optimizer:
+    def __init__(self, module):
+        # build the optimized nodes from the same module as the original tree
+        self.module = module
+        self.rules = {
+            'Add': self.optimize_add,
+            'Multiply': self.optimize_multiply,
+            'LessThan': self.optimize_less_than,
+            'Assign': self.optimize_assign,
+            'IF': self.optimize_if,
+            'Sequence': self.optimize_sequence,
+            'While': self.optimize_while,
+        }
+
+    def optimize(self, node):
+        # bottom up over the tree like Interner.intern, every rule gets the optimized fields of its node,
+        # leaves and unknown nodes are kept as they are
+        optimized = {}
+        for original in walk(node):
+            rule = self.rules.get(type(original).__name__)
+            if rule is None:
+                optimized[id(original)] = original
+            else:
+                optimized[id(original)] = rule(*[optimized[id(field)] if isinstance(field, Node) else field
+                                                 for field in original.fields])
+        return optimized[id(node)]
+
+    def is_number(self, node, value=None):
+        return isinstance(node, self.module.Number) and (value is None or node.value == value)
+
+    def is_numeric(self, node):
+        # only these evaluate to a number, x + 0 is a number even when x is a boolean
+        return isinstance(node, (self.module.Number, self.module.Add, self.module.Multiply))
+
+    def optimize_add(self, left, right):
+        if self.is_number(left) and self.is_number(right):
+            return self.module.Number(left.value + right.value)
+        if self.is_number(right, 0) and self.is_numeric(left):
+            return left
+        if self.is_number(left, 0) and self.is_numeric(right):
+            return right
+        return self.module.Add(left, right)
+
+    def optimize_multiply(self, left, right):
+        if self.is_number(left) and self.is_number(right):
+            return self.module.Number(left.value * right.value)
+        if self.is_number(right, 1) and self.is_numeric(left):
+            return left
+        if self.is_number(left, 1) and self.is_numeric(right):
+            return right
+        return self.module.Multiply(left, right)
+
+    def optimize_less_than(self, left, right):
+        if self.is_number(left) and self.is_number(right):
+            return self.module.Boolean(left.value < right.value)
+        return self.module.LessThan(left, right)
+
+    def optimize_assign(self, name, expression):
+        return self.module.Assign(name, expression)
+
+    def optimize_if(self, condition, consequence, alternative):
+        # a constant condition keeps only the branch it would take
+        if isinstance(condition, self.module.Boolean):
+            return consequence if condition.value is True else alternative
+        return self.module.IF(condition, consequence, alternative)
+
+    def optimize_sequence(self, first, second):
+        if isinstance(first, self.module.DoNothing):
+            return second
+        if isinstance(second, self.module.DoNothing):
+            return first
+        return self.module.Sequence(first, second)
+
+    def optimize_while(self, condition, body):
+        # a loop which never runs is dropped, a loop which always runs is kept as it is
+        if isinstance(condition, self.module.Boolean) and condition.value is not True:
+            return self.module.DoNothing()
+        return self.module.While(condition, body)
+
+
+def optimize(node):
+    return Optimizer(sys.modules[type(node).__module__]).optimize(node)
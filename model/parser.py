@@ -0,0 +1,384 @@
+from model import big_step
+from model.regex import parse as parse_pattern, new_state
+from model.state_machine import FARule, NFARuleBook, NFAFactory
+
+
+# token kinds and their patterns, earlier patterns win when two of them match the same text
+TOKENS = [
+    ('space', '[ \t\r\n]+'),
+    ('number', '[0-9]+'),
+    ('while', 'while'),
+    ('if', 'if'),
+    ('else', 'else'),
+    ('true', 'true'),
+    ('false', 'false'),
+    ('do-nothing', 'do-nothing'),
+    ('name', '[a-zA-Z_][a-zA-Z0-9_]*'),
+    ('+', '\\+'),
+    ('*', '\\*'),
+    ('<', '<'),
+    ('=', '='),
+    (';', ';'),
+    ('(', '\\('),
+    (')', '\\)'),
+    ('{', '{'),
+    ('}', '}'),
+]
+SEPARATORS = set(' \t\r\n;')
+
+
+class Token:
+    __slots__ = ('kind', 'text', 'start', 'end')
+
+    def __init__(self, kind, text, start, end):
+        self.kind = kind
+        self.text = text
+        self.start = start
+        self.end = end
+
+    def __repr__(self):
+        return f'{self.kind}:{self.text!r}@{self.start}'
+
+
+class Lexer:
+    def __init__(self, patterns=TOKENS):
+        # one nfa choosing between every pattern, determinized and compiled into a table
+        start_state = new_state()
+        rules = []
+        accept_states = []
+        for kind, text in patterns:
+            factory = parse_pattern(text).to_nfa_design()
+            rules.extend(factory.rulebook.rules)
+            rules.append(FARule(start_state, None, factory.start_state))
+            accept_states.append((kind, set(factory.accept_states)))
+        design = NFAFactory(start_state, [state for _, states in accept_states for state in states], NFARuleBook(rules))
+        dfa = design.to_dfa().compile()
+
+        self.rulebook = dfa.rulebook
+        self.start = self.rulebook.state_index[dfa.start_state]
+        # the token kind every table state accepts, None for states in the middle of a token
+        self.kinds = [next((kind for kind, states in accept_states if not states.isdisjoint(state)), None)
+                      for state in self.rulebook.states]
+
+    def tokenize(self, text, start=0, end=None):
+        # maximal munch, run the table as far as it goes and cut at the last accepting state
+        if end is None:
+            end = len(text)
+        table = self.rulebook.table
+        width = self.rulebook.width
+        character_index = self.rulebook.character_index
+        kinds = self.kinds
+        position = start
+        while position < end:
+            index = self.start
+            last_kind = None
+            last_end = position
+            cursor = position
+            while cursor < end:
+                column = character_index.get(text[cursor])
+                if column is None:
+                    break
+                index = table[index * width + column]
+                if index < 0:
+                    break
+                cursor += 1
+                if kinds[index] is not None:
+                    last_kind = kinds[index]
+                    last_end = cursor
+            if last_kind is None:
+                raise SyntaxError(f'unexpected {text[position]!r} at {position}')
+            if last_kind != 'space':
+                yield Token(last_kind, text[position:last_end], position, last_end)
+            position = last_end
+
+
+LEXER = None
+
+
+def lexer():
+    # building the table takes a while, so it is shared by every parser
+    global LEXER
+    if LEXER is None:
+        LEXER = Lexer()
+    return LEXER
+
+
+class Parser:
+    def __init__(self, tokens, module=big_step, end=0):
+        self.tokens = list(tokens)
+        self.position = 0
+        self.module = module
+        # the offset reported for an unexpected end of input
+        self.end = end
+
+    def peek(self):
+        if self.position < len(self.tokens):
+            return self.tokens[self.position].kind
+
+    def take(self):
+        if self.position >= len(self.tokens):
+            raise SyntaxError(f'unexpected end of program at {self.end}')
+        self.position += 1
+        return self.tokens[self.position - 1]
+
+    def expect(self, kind):
+        token = self.take()
+        if token.kind != kind:
+            raise SyntaxError(f'expected {kind!r} but got {token.text!r} at {token.start}')
+        return token
+
+    def done(self):
+        if self.position < len(self.tokens):
+            token = self.tokens[self.position]
+            raise SyntaxError(f'unexpected {token.text!r} at {token.start}')
+
+    def sequence(self, statements):
+        # a; b; c is <a; <b; c>>, and nothing at all does nothing
+        if not statements:
+            return self.module.DoNothing()
+        statement = statements[-1]
+        for first in reversed(statements[:-1]):
+            statement = self.module.Sequence(first, statement)
+        return statement
+
+    def parse_program(self):
+        statement = self.sequence([statement for statement, *_ in self.parse_statements()])
+        self.done()
+        return statement
+
+    def parse_statements(self):
+        # statements separated by semicolons, with the offsets of their first and last tokens and their blocks
+        statements = []
+        if self.peek() in (None, '}'):
+            return statements
+        while True:
+            start = self.tokens[self.position].start
+            blocks = []
+            statement = self.parse_statement(blocks)
+            statements.append((statement, start, self.tokens[self.position - 1].end, blocks))
+            if self.peek() != ';':
+                return statements
+            self.position += 1
+            # a trailing semicolon is fine
+            if self.peek() in (None, '}'):
+                return statements
+
+    def parse_block(self, blocks, field):
+        # blocks collects the field, the offsets inside the braces and the statements of every block
+        start = self.expect('{').end
+        statements = self.parse_statements()
+        end = self.expect('}').start
+        blocks.append((field, start, end, statements))
+        return self.sequence([statement for statement, *_ in statements])
+
+    def parse_statement(self, blocks):
+        kind = self.peek()
+        if kind == 'while':
+            self.position += 1
+            self.expect('(')
+            condition = self.parse_expression()
+            self.expect(')')
+            return self.module.While(condition, self.parse_block(blocks, 'body'))
+        if kind == 'if':
+            self.position += 1
+            self.expect('(')
+            condition = self.parse_expression()
+            self.expect(')')
+            consequence = self.parse_block(blocks, 'consequence')
+            alternative = self.module.DoNothing()
+            if self.peek() == 'else':
+                self.position += 1
+                alternative = self.parse_block(blocks, 'alternative')
+            return self.module.IF(condition, consequence, alternative)
+        if kind == 'do-nothing':
+            self.position += 1
+            return self.module.DoNothing()
+        name = self.expect('name')
+        self.expect('=')
+        return self.module.Assign(name.text, self.parse_expression())
+
+    def parse_expression(self):
+        expression = self.parse_add()
+        if self.peek() == '<':
+            self.position += 1
+            expression = self.module.LessThan(expression, self.parse_add())
+        return expression
+
+    def parse_add(self):
+        expression = self.parse_multiply()
+        while self.peek() == '+':
+            self.position += 1
+            expression = self.module.Add(expression, self.parse_multiply())
+        return expression
+
+    def parse_multiply(self):
+        expression = self.parse_term()
+        while self.peek() == '*':
+            self.position += 1
+            expression = self.module.Multiply(expression, self.parse_term())
+        return expression
+
+    def parse_term(self):
+        token = self.take()
+        if token.kind == 'number':
+            return self.module.Number(int(token.text))
+        if token.kind in ('true', 'false'):
+            return self.module.Boolean(token.kind == 'true')
+        if token.kind == 'name':
+            return self.module.Variable(token.text)
+        if token.kind == '(':
+            expression = self.parse_expression()
+            self.expect(')')
+            return expression
+        raise SyntaxError(f'unexpected {token.text!r} at {token.start}')
+
+
+def parse(text, module=big_step):
+    return Parser(lexer().tokenize(text), module, len(text)).parse_program()
+
+
+def parse_expression(text, module=big_step):
+    parser = Parser(lexer().tokenize(text), module, len(text))
+    expression = parser.parse_expression()
+    parser.done()
+    return expression
+
+
+def shifted(statements, shift):
+    # the same statements moved by the length difference of an edit in front of them
+    if not shift:
+        return statements
+    return [(node, start + shift, end + shift,
+             [(field, first + shift, last + shift, shifted(inner, shift)) for field, first, last, inner in blocks])
+            for node, start, end, blocks in statements]
+
+
+class IncrementalParser:
+    def __init__(self, module=big_step):
+        self.module = module
+        self.text = ''
+        # the top level statements of the last text, with their offsets and blocks
+        self.statements = []
+        self.tree = module.DoNothing()
+        # how many statements the last parse took over from the one before, at every level
+        self.reused = 0
+
+    def parse(self, text):
+        # only the statements touching the edit are parsed again, the others are kept as they are,
+        # shifted by the length difference of the edit
+        old = self.text
+        limit = min(len(old), len(text))
+        prefix = 0
+        while prefix < limit and old[prefix] == text[prefix]:
+            prefix += 1
+        suffix = 0
+        while suffix < limit - prefix and old[-1 - suffix] == text[-1 - suffix]:
+            suffix += 1
+        edit = (prefix, len(old) - suffix, len(text) - len(old))
+
+        try:
+            statements, reused = self.reparse(text, self.statements, 0, len(text), edit)
+        except SyntaxError:
+            # the edit might have broken a separator next to the kept statements, start over
+            parser = Parser(lexer().tokenize(text), self.module, len(text))
+            statements = parser.parse_statements()
+            parser.done()
+            reused = 0
+
+        self.text = text
+        self.statements = statements
+        self.reused = reused
+        self.tree = self.sequence(statements)
+        return self.tree
+
+    def sequence(self, statements):
+        return Parser([], self.module).sequence([statement for statement, *_ in statements])
+
+    def reparse(self, text, statements, low, high, edit):
+        # the new statements between low and high of the new text, and how many of them were kept
+        prefix, edit_end, shift = edit
+
+        # an edit inside the braces of a block only parses that block again,
+        # the braces keep its tokens apart from everything around it
+        for position, (node, start, end, blocks) in enumerate(statements):
+            if start > prefix:
+                break
+            for number, (field, first, last, inner) in enumerate(blocks):
+                if first <= prefix and edit_end <= last:
+                    inner, reused = self.reparse(text, inner, first, last + shift, edit)
+                    node = node.replace(field, self.sequence(inner))
+                    blocks = blocks[:number] + [(field, first, last + shift, inner)] \
+                        + shifted(blocks[number + 1:], shift)
+                    kept = statements[:position] + [(node, start, end + shift, blocks)] \
+                        + shifted(statements[position + 1:], shift)
+                    return kept, len(statements) - 1 + reused
+
+        # a statement touching the edit is only kept when a separator keeps its tokens apart from the new text
+        bound = prefix if prefix < high and text[prefix] in SEPARATORS else prefix - 1
+        before = [statement for statement in statements if statement[2] <= bound]
+        bound = edit_end if low < edit_end + shift <= high and text[edit_end + shift - 1] in SEPARATORS \
+            else edit_end + 1
+        after = shifted([statement for statement in statements if statement[1] >= bound], shift)
+        start = before[-1][2] if before else low
+        end = after[0][1] if after else high
+
+        parser = Parser(lexer().tokenize(text, start, end), self.module, end)
+        if before:
+            parser.expect(';')
+        middle = parser.parse_statements()
+        parser.done()
+        # nothing at all in between needs no separator either
+        if after and parser.tokens and parser.tokens[-1].kind != ';':
+            raise SyntaxError(f'expected \';\' at {end}')
+        return before + middle + after, len(before) + len(after)
+
+
+# binding strength of the operators, a child binding weaker than its place needs brackets
+PRECEDENCE = {'LessThan': 1, 'Add': 2, 'Multiply': 3}
+OPERATORS = {'LessThan': ' < ', 'Add': ' + ', 'Multiply': ' * '}
+
+
+def unparse(node):
+    # source text for the program, built with an explicit stack like walk,
+    # pending holds text and (node, precedence of its place) pairs,
+    # parse only turns it back into the same tree when sequences nest to the right, which is how parse builds them,
+    # the grammar has no brackets for statements, so <<a; b>; c> comes back as <a; <b; c>>, which runs the same
+    pieces = []
+    pending = [(node, 0)]
+    while pending:
+        item = pending.pop()
+        if isinstance(item, str):
+            pieces.append(item)
+            continue
+        node, outer = item
+        kind = type(node).__name__
+        if kind == 'Number':
+            if isinstance(node.value, bool) or not isinstance(node.value, int) or node.value < 0:
+                raise ValueError(f'can not write {node!r} as source')
+            pieces.append(str(node.value))
+        elif kind == 'Boolean':
+            pieces.append('true' if node.value else 'false')
+        elif kind == 'Variable':
+            pieces.append(node.name)
+        elif kind in PRECEDENCE:
+            precedence = PRECEDENCE[kind]
+            # + and * group to the left, < doesn't group at all
+            left = precedence + 1 if kind == 'LessThan' else precedence
+            bracket = precedence < outer
+            pending.extend([')'] if bracket else [])
+            pending.extend([(node.right, precedence + 1), OPERATORS[kind], (node.left, left)])
+            pending.extend(['('] if bracket else [])
+        elif kind == 'DoNothing':
+            pieces.append('do-nothing')
+        elif kind == 'Assign':
+            pending.extend([(node.expression, 0), f'{node.name} = '])
+        elif kind == 'Sequence':
+            pending.extend([(node.second, 0), '; ', (node.first, 0)])
+        elif kind == 'IF':
+            pending.extend([' }', (node.alternative, 0), ' } else { ', (node.consequence, 0), ') { ',
+                            (node.condition, 0), 'if ('])
+        elif kind == 'While':
+            pending.extend([' }', (node.body, 0), ') { ', (node.condition, 0), 'while ('])
+        else:
+            raise TypeError(f'can not unparse {node!r}')
+    return ''.join(pieces)
@@ -0,0 +1,138 @@
+from collections import defaultdict
+from time import perf_counter
+
+from model import big_step, small_step
+from model.environment import Environment
+
+
+# the methods wrapped in every class of the profiled modules, whichever of them the class defines itself
+METHODS = ('evaluate', 'execute', 'reduce', 'contract', 'fast_reduce', 'step')
+
+ACTIVE = None
+
+
+class Stats:
+    __slots__ = ('calls', 'total', 'own')
+
+    def __init__(self):
+        self.calls = 0
+        # seconds spent in the method, and the part of it not spent in other profiled methods
+        self.total = 0.0
+        self.own = 0.0
+
+    def __repr__(self):
+        return f'<{self.calls} calls, {self.total * 1000:.3f} ms, {self.own * 1000:.3f} ms own>'
+
+
+class Profiler:
+    def __init__(self, modules=(big_step, small_step)):
+        self.modules = modules
+        self.stats = defaultdict(Stats)
+        # own seconds per stack of labels, the shape flame graph tools take
+        self.stacks = defaultdict(float)
+        self.env_copies = 0
+        self.env_copy_size = 0
+        self.env_updates = 0
+        self.env_update_size = 0
+        # the labels of the running methods, and the seconds spent in the methods they called
+        self.frames = []
+        self.children = []
+        self.patched = []
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.disable()
+
+    def enable(self):
+        # nothing is wrapped until now, and disable puts the original methods back,
+        # so evaluation without a profiler runs exactly the code it always did
+        global ACTIVE
+        if ACTIVE is not None:
+            raise RuntimeError('another profiler is already enabled')
+        ACTIVE = self
+        for module in self.modules:
+            for cls in vars(module).values():
+                if not isinstance(cls, type) or cls.__module__ != module.__name__:
+                    continue
+                for name in METHODS:
+                    if name in cls.__dict__:
+                        self.patch(cls, name, self.timed(f'{cls.__name__}.{name}', cls.__dict__[name]))
+        self.patch(Environment, '__init__', self.copying(Environment.__init__))
+        self.patch(Environment, 'set', self.updating(Environment.set))
+
+    def disable(self):
+        global ACTIVE
+        for cls, name, original in reversed(self.patched):
+            setattr(cls, name, original)
+        self.patched = []
+        if ACTIVE is self:
+            ACTIVE = None
+
+    def patch(self, cls, name, function):
+        self.patched.append((cls, name, cls.__dict__[name]))
+        setattr(cls, name, function)
+
+    def timed(self, label, method):
+        stats = self.stats[label]
+        frames = self.frames
+        children = self.children
+        stacks = self.stacks
+
+        def wrapper(*args, **kwargs):
+            frames.append(label)
+            children.append(0.0)
+            start = perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                elapsed = perf_counter() - start
+                own = elapsed - children.pop()
+                stacks[tuple(frames)] += own
+                frames.pop()
+                if children:
+                    children[-1] += elapsed
+                stats.calls += 1
+                stats.total += elapsed
+                stats.own += own
+        return wrapper
+
+    def copying(self, method):
+        def wrapper(env, bindings=None):
+            if bindings is not None:
+                self.env_copies += 1
+                self.env_copy_size += len(bindings)
+            method(env, bindings)
+        return wrapper
+
+    def updating(self, method):
+        def wrapper(env, name, value):
+            self.env_updates += 1
+            self.env_update_size += len(env)
+            return method(env, name, value)
+        return wrapper
+
+    def report(self):
+        # the busiest methods first
+        lines = [f'{"method":<32}{"calls":>10}{"total ms":>12}{"own ms":>12}']
+        for label, stats in sorted(self.stats.items(), key=lambda item: item[1].own, reverse=True):
+            if stats.calls:
+                lines.append(f'{label:<32}{stats.calls:>10}{stats.total * 1000:>12.3f}{stats.own * 1000:>12.3f}')
+        lines.append(f'env copies: {self.env_copies} ({self.env_copy_size} bindings), '
+                     f'env updates: {self.env_updates} ({self.env_update_size} bindings)')
+        return '\n'.join(lines)
+
+    def collapsed(self):
+        # one "outer;inner microseconds" line per stack, the input of flamegraph.pl and speedscope
+        lines = []
+        for stack, seconds in sorted(self.stacks.items()):
+            microseconds = round(seconds * 1000000)
+            if microseconds:
+                lines.append(f'{";".join(stack)} {microseconds}')
+        return '\n'.join(lines)
+
+    def write_collapsed(self, path):
+        with open(path, 'w') as file:
+            file.write(self.collapsed() + '\n')
@@ -0,0 +1,275 @@
+from functools import lru_cache
+from itertools import count
+
+from model.state_machine import FARule, NFARuleBook, NFAFactory
+
+
+SPECIAL_CHARACTERS = set('|*+?()[]\\')
+STATES = count()
+
+
+def new_state():
+    # states only need to be unique, numbers keep the rules readable
+    return next(STATES)
+
+
+class Pattern:
+    precedence = 0
+    children = ()
+
+    def bracket(self, outer_precedence):
+        if self.precedence < outer_precedence:
+            return f'({self})'
+        return str(self)
+
+    def __repr__(self):
+        return f'/{self}/'
+
+    def to_nfa_design(self):
+        # the thompson nfa, built children first with an explicit stack like walk, every pattern appends
+        # its rules to one list and leaves the start state and accept states of its part on fragments
+        rules = []
+        fragments = []
+        pending = [(self, False)]
+        while pending:
+            pattern, visited = pending.pop()
+            if visited:
+                count = len(pattern.children)
+                parts = fragments[len(fragments) - count:]
+                del fragments[len(fragments) - count:]
+                fragments.append(pattern.build(rules, *parts))
+            else:
+                pending.append((pattern, True))
+                pending.extend((child, False) for child in reversed(pattern.children))
+        start_state, accept_states = fragments.pop()
+        return NFAFactory(start_state, accept_states, NFARuleBook(rules))
+
+    def matches(self, string):
+        return bool(self.to_nfa_design().accept(string))
+
+
+class Empty(Pattern):
+    precedence = 3
+
+    def __str__(self):
+        return ''
+
+    def build(self, rules):
+        start_state = new_state()
+        return start_state, [start_state]
+
+
+class Literal(Pattern):
+    precedence = 3
+
+    def __init__(self, character):
+        self.character = character
+
+    def __str__(self):
+        if self.character in SPECIAL_CHARACTERS:
+            return f'\\{self.character}'
+        return self.character
+
+    def build(self, rules):
+        start_state = new_state()
+        accept_state = new_state()
+        rules.append(FARule(start_state, self.character, accept_state))
+        return start_state, [accept_state]
+
+
+class CharacterClass(Pattern):
+    precedence = 3
+
+    def __init__(self, characters):
+        self.characters = characters
+
+    def __str__(self):
+        return '[' + ''.join(f'\\{character}' if character in SPECIAL_CHARACTERS or character == '-' else character
+                             for character in self.characters) + ']'
+
+    def build(self, rules):
+        start_state = new_state()
+        accept_state = new_state()
+        rules.extend(FARule(start_state, character, accept_state) for character in self.characters)
+        return start_state, [accept_state]
+
+
+class Concatenate(Pattern):
+    precedence = 1
+
+    def __init__(self, first, second):
+        self.first = first
+        self.second = second
+
+    @property
+    def children(self):
+        return self.first, self.second
+
+    def __str__(self):
+        return ''.join(pattern.bracket(self.precedence) for pattern in (self.first, self.second))
+
+    def build(self, rules, first, second):
+        # every accept state of the first pattern moves freely into the second one
+        rules.extend(FARule(state, None, second[0]) for state in first[1])
+        return first[0], second[1]
+
+
+class Choose(Pattern):
+    precedence = 0
+
+    def __init__(self, first, second):
+        self.first = first
+        self.second = second
+
+    @property
+    def children(self):
+        return self.first, self.second
+
+    def __str__(self):
+        return '|'.join(pattern.bracket(self.precedence) for pattern in (self.first, self.second))
+
+    def build(self, rules, first, second):
+        # a new start state moves freely into both patterns
+        start_state = new_state()
+        rules.extend([FARule(start_state, None, first[0]), FARule(start_state, None, second[0])])
+        return start_state, first[1] + second[1]
+
+
+class Repeat(Pattern):
+    precedence = 2
+    operator = '*'
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+
+    @property
+    def children(self):
+        return self.pattern,
+
+    def __str__(self):
+        return self.pattern.bracket(self.precedence) + self.operator
+
+    def build(self, rules, pattern):
+        # a new accepting start state for zero repetition, and accept states loop back to the start
+        start_state = new_state()
+        rules.extend(FARule(state, None, pattern[0]) for state in pattern[1])
+        rules.append(FARule(start_state, None, pattern[0]))
+        return start_state, pattern[1] + [start_state]
+
+
+class OneOrMore(Repeat):
+    operator = '+'
+
+    def build(self, rules, pattern):
+        rules.extend(FARule(state, None, pattern[0]) for state in pattern[1])
+        return pattern
+
+
+class Optional(Repeat):
+    operator = '?'
+
+    def build(self, rules, pattern):
+        start_state = new_state()
+        rules.append(FARule(start_state, None, pattern[0]))
+        return start_state, pattern[1] + [start_state]
+
+
+class Parser:
+    def __init__(self, text):
+        self.text = text
+        self.position = 0
+
+    def peek(self):
+        if self.position < len(self.text):
+            return self.text[self.position]
+
+    def take(self):
+        character = self.peek()
+        if character is None:
+            raise SyntaxError(f'unexpected end of pattern {self.text!r}')
+        self.position += 1
+        return character
+
+    def expect(self, character):
+        if self.peek() != character:
+            raise SyntaxError(f'expected {character!r} at {self.position} in pattern {self.text!r}')
+        self.position += 1
+
+    def parse(self):
+        pattern = self.parse_choose()
+        if self.peek() is not None:
+            raise SyntaxError(f'unexpected {self.peek()!r} at {self.position} in pattern {self.text!r}')
+        return pattern
+
+    def parse_choose(self):
+        pattern = self.parse_concatenate()
+        while self.peek() == '|':
+            self.position += 1
+            pattern = Choose(pattern, self.parse_concatenate())
+        return pattern
+
+    def parse_concatenate(self):
+        pattern = None
+        while self.peek() is not None and self.peek() not in '|)':
+            repeat = self.parse_repeat()
+            pattern = repeat if pattern is None else Concatenate(pattern, repeat)
+        return Empty() if pattern is None else pattern
+
+    def parse_repeat(self):
+        pattern = self.parse_atom()
+        while self.peek() is not None and self.peek() in '*+?':
+            pattern = {'*': Repeat, '+': OneOrMore, '?': Optional}[self.take()](pattern)
+        return pattern
+
+    def parse_atom(self):
+        character = self.take()
+        if character == '(':
+            pattern = self.parse_choose()
+            self.expect(')')
+            return pattern
+        if character == '[':
+            return self.parse_character_class()
+        if character == '\\':
+            return Literal(self.take())
+        if character in SPECIAL_CHARACTERS:
+            raise SyntaxError(f'unexpected {character!r} at {self.position - 1} in pattern {self.text!r}')
+        return Literal(character)
+
+    def parse_character_class(self):
+        # literal characters, escapes and ranges like a-z, until the closing bracket
+        characters = []
+        while self.peek() != ']':
+            character = self.take()
+            if character == '\\':
+                character = self.take()
+            elif self.peek() == '-' and self.position + 1 < len(self.text) and self.text[self.position + 1] != ']':
+                self.position += 1
+                last = self.take()
+                if last == '\\':
+                    last = self.take()
+                if ord(last) < ord(character):
+                    raise SyntaxError(f'bad range {character}-{last} in pattern {self.text!r}')
+                characters.extend(chr(code) for code in range(ord(character), ord(last) + 1))
+                continue
+            characters.append(character)
+        self.expect(']')
+        if not characters:
+            raise SyntaxError(f'empty character class in pattern {self.text!r}')
+        return CharacterClass(''.join(dict.fromkeys(characters)))
+
+
+def parse(text) -> Pattern:
+    return Parser(text).parse()
+
+
+@lru_cache(maxsize=256)
+def compile(text, deterministic=False):
+    # hot patterns are parsed and built only once, the deterministic version is also compiled into a table
+    factory = parse(text).to_nfa_design()
+    if deterministic:
+        return factory.to_dfa().compile()
+    return factory
+
+
+def matches(text, string):
+    return bool(compile(text, deterministic=True).accept(string))
@@ -0,0 +1,76 @@
+from collections.abc import Mapping
+
+from model.state_machine import FARule, NFARuleBook, LazyDFARuleBook
+
+
+class ScanningRuleBook(LazyDFARuleBook):
+
+    def __init__(self, rulebook: NFARuleBook, start_states, accept_states, order, cache_size=4096):
+        # a state is a tuple of groups of nfa states, one group per start position that is still alive,
+        # earliest start first, every nfa state belongs to the earliest start it can be reached from
+        super().__init__(rulebook, cache_size)
+        self.start_states = frozenset(start_states)
+        self.accept_states = accept_states
+        self.order = order
+
+    def subset(self, state, character):
+        # a match can start at every position, so the start states join as the latest group before moving on,
+        # the result is the next state, which groups of this one it keeps and what it accepts
+        claimed = set()
+        groups = []
+        keep = []
+        for index, group in enumerate(state + (self.start_states,)):
+            moved = self.rulebook.next_states(group, character) - claimed
+            if moved:
+                claimed |= moved
+                groups.append(frozenset(moved))
+                keep.append(index)
+
+        # every pattern matches from the earliest group holding one of its accept states
+        matches = {}
+        for index, group in enumerate(groups):
+            for _state in group:
+                pattern_id = self.accept_states.get(_state)
+                if pattern_id is not None and pattern_id not in matches:
+                    matches[pattern_id] = index
+        matches = sorted((index, self.order[pattern_id], pattern_id) for pattern_id, index in matches.items())
+        return tuple(groups), keep, [(index, pattern_id) for index, _, pattern_id in matches]
+
+
+class Scanner:
+    def __init__(self, factories, cache_size=4096):
+        # tag the states of every automaton with its pattern id and merge all of them into one rulebook
+        if not isinstance(factories, Mapping):
+            factories = dict(enumerate(factories))
+
+        rules = []
+        start_states = []
+        self.accept_states = {}
+        for pattern_id, factory in factories.items():
+            if isinstance(factory.rulebook, LazyDFARuleBook):
+                raise TypeError(f'pattern {pattern_id!r} has no rule list to scan with, determinize it eagerly')
+            rules.extend(FARule((pattern_id, rule.state), rule.character, (pattern_id, rule.next_state))
+                         for rule in factory.rulebook.rules)
+            start_states.append((pattern_id, factory.start_state))
+            for state in factory.accept_states:
+                self.accept_states[(pattern_id, state)] = pattern_id
+        self.rulebook = NFARuleBook(rules)
+        self.order = {pattern_id: order for order, pattern_id in enumerate(factories)}
+
+        # the merged automaton is determinized on the fly, so every character costs one cached lookup
+        # however many patterns there are
+        self.forward = ScanningRuleBook(self.rulebook, self.rulebook.follow_free_moves(start_states),
+                                        self.accept_states, self.order, cache_size)
+
+    def scan(self, text):
+        # one pass over any iterable of characters, yield (pattern_id, start, end) for every end position,
+        # where start is the leftmost position the pattern matches text[start:end] from,
+        # starts holds the start position of every group of the current state
+        state = ()
+        starts = []
+        for position, character in enumerate(text):
+            state, keep, matches = self.forward.next_state(state, character)
+            starts.append(position)
+            starts = [starts[index] for index in keep]
+            for index, pattern_id in matches:
+                yield pattern_id, starts[index], position + 1
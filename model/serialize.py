@@ -0,0 +1,300 @@
+import importlib
+import mmap
+import struct
+import sys
+from array import array
+
+from model.node import walk
+from model.state_machine import FARule, DFAFactory, NFARuleBook, NFAFactory, CompiledDFARuleBook
+
+
+# every file starts with the magic, the format version, the kind of content and the byte order of its arrays,
+# then come four int32 fields whose meaning depends on the kind, and the sections, each padded to 8 bytes
+MAGIC = b'SIMP'
+VERSION = 2
+AST, DFA, NFA = 1, 2, 3
+HEADER = struct.Struct('<4sBBBx4i')
+BYTE_ORDERS = ('little', 'big')
+
+# node kinds, each node is four int32: kind and three operands, which are node indices, string indices,
+# constant indices or flags depending on the kind, unused operands are 0
+KINDS = ('Number', 'Boolean', 'Variable', 'Add', 'Multiply', 'LessThan',
+         'DoNothing', 'Assign', 'IF', 'Sequence', 'While')
+NODE_WIDTH = 4
+
+# every constant is two int64: its tag and its payload, which is the value itself for an int64,
+# the bits of a float64, or the string index of the decimal digits of a bigger int
+INT, FLOAT, BIG_INT = 0, 1, 2
+INT_RANGE = range(-(1 << 63), 1 << 63)
+DOUBLE = struct.Struct('d')
+INT64 = struct.Struct('q')
+
+# the modules a file may ask for, any other one has to be passed in
+MODULES = ('model.big_step', 'model.small_step')
+
+
+class Writer:
+    def __init__(self, kind, *fields):
+        self.data = bytearray(HEADER.pack(MAGIC, VERSION, kind, BYTE_ORDERS.index(sys.byteorder), *fields))
+
+    def pad(self):
+        self.data.extend(bytes(-len(self.data) % 8))
+
+    def strings(self, strings):
+        # the count, the end offset of every string in the blob, then the utf-8 blob
+        encoded = [string.encode() for string in strings]
+        ends = array('i')
+        end = 0
+        for string in encoded:
+            end += len(string)
+            ends.append(end)
+        self.ints(array('i', [len(encoded)]) + ends)
+        self.data.extend(b''.join(encoded))
+        self.pad()
+
+    def ints(self, values):
+        self.data.extend(values.tobytes())
+        self.pad()
+
+
+class Reader:
+    def __init__(self, data):
+        self.view = memoryview(data).cast('B')
+        magic, version, self.kind, byte_order, *self.fields = HEADER.unpack_from(self.view)
+        if magic != MAGIC:
+            raise ValueError('not a serialized automaton or program')
+        if version != VERSION:
+            raise ValueError(f'unsupported format version {version}')
+        self.byte_order = BYTE_ORDERS[byte_order]
+        self.native = self.byte_order == sys.byteorder
+        self.offset = HEADER.size + (-HEADER.size % 8)
+
+    def ints(self, count, typecode='i'):
+        # a view straight into the data when the byte order matches, a swapped copy otherwise
+        size = count * array(typecode).itemsize
+        chunk = self.view[self.offset:self.offset + size]
+        self.offset += size + (-size % 8)
+        if self.native:
+            return chunk.cast(typecode)
+        values = array(typecode, chunk.tobytes())
+        values.byteswap()
+        return values
+
+    def strings(self):
+        # the count is written in front of the end offsets, as part of the same array
+        count = int.from_bytes(self.view[self.offset:self.offset + 4], self.byte_order, signed=True)
+        ends = self.ints(count + 1)[1:]
+        blob = self.view[self.offset:self.offset + (ends[-1] if count else 0)]
+        self.offset += len(blob) + (-len(blob) % 8)
+        strings = []
+        start = 0
+        for end in ends:
+            strings.append(str(blob[start:end], 'utf-8'))
+            start = end
+        return strings
+
+
+class Table:
+    # numbers distinct values in order of appearance
+    def __init__(self):
+        self.indices = {}
+
+    def __call__(self, value):
+        key = (type(value), value)
+        if key not in self.indices:
+            self.indices[key] = len(self.indices)
+        return self.indices[key]
+
+    def values(self):
+        return [value for _, value in self.indices]
+
+
+def dump_node(node):
+    # a flat table of the distinct nodes, children before their parents, the root is the last one
+    nodes = walk(node)
+    position = {id(node): index for index, node in enumerate(nodes)}
+    strings = Table()
+    constants = Table()
+    table = array('i')
+    for node in nodes:
+        kind = type(node).__name__
+        if kind not in KINDS:
+            raise TypeError(f'can not serialize {node!r}')
+        if kind == 'Number':
+            operands = (constants(node.value),)
+        elif kind == 'Boolean':
+            operands = (int(node.value),)
+        elif kind == 'Variable':
+            operands = (strings(node.name),)
+        elif kind == 'Assign':
+            operands = (strings(node.name), position[id(node.expression)])
+        else:
+            operands = tuple(position[id(field)] for field in node.fields)
+        table.extend((KINDS.index(kind),) + operands + (0,) * (NODE_WIDTH - 1 - len(operands)))
+
+    values = array('q')
+    for value in constants.values():
+        if isinstance(value, int) and value in INT_RANGE:
+            values.extend((INT, value))
+        elif isinstance(value, int):
+            values.extend((BIG_INT, strings(str(value))))
+        elif isinstance(value, float):
+            values.extend((FLOAT, INT64.unpack(DOUBLE.pack(value))[0]))
+        else:
+            raise ValueError(f'can not serialize the number {value!r}')
+
+    module = strings(type(node).__module__)
+    writer = Writer(AST, module, len(nodes), len(constants.indices), 0)
+    writer.strings(strings.values())
+    writer.ints(values)
+    writer.ints(table)
+    return bytes(writer.data)
+
+
+def load_constant(tag, payload, strings):
+    if tag == INT:
+        return payload
+    if tag == FLOAT:
+        return DOUBLE.unpack(INT64.pack(payload))[0]
+    if tag == BIG_INT:
+        return int(strings[payload])
+    raise ValueError(f'unknown constant tag {tag}')
+
+
+def load_node(reader, module=None):
+    module_name, count, constant_count, _ = reader.fields
+    strings = reader.strings()
+    values = reader.ints(constant_count * 2, 'q')
+    constants = [load_constant(values[position], values[position + 1], strings)
+                 for position in range(0, len(values), 2)]
+    table = reader.ints(count * NODE_WIDTH)
+    if module is None:
+        if strings[module_name] not in MODULES:
+            raise ValueError(f'unknown node module {strings[module_name]!r}')
+        module = importlib.import_module(strings[module_name])
+    classes = [getattr(module, kind) for kind in KINDS]
+
+    nodes = []
+    for position in range(0, len(table), NODE_WIDTH):
+        kind, a, b, c = table[position:position + NODE_WIDTH]
+        name = KINDS[kind]
+        if name == 'Number':
+            node = classes[kind](constants[a])
+        elif name == 'Boolean':
+            node = classes[kind](bool(a))
+        elif name == 'Variable':
+            node = classes[kind](strings[a])
+        elif name == 'Assign':
+            node = classes[kind](strings[a], nodes[b])
+        elif name == 'DoNothing':
+            node = classes[kind]()
+        elif name == 'IF':
+            node = classes[kind](nodes[a], nodes[b], nodes[c])
+        else:
+            node = classes[kind](nodes[a], nodes[b])
+        nodes.append(node)
+    return nodes[-1]
+
+
+def dump_dfa(factory):
+    # the dense table of the compiled rulebook, states become their row numbers
+    rulebook = factory.rulebook.compile()
+    if not isinstance(rulebook, CompiledDFARuleBook):
+        raise TypeError(f'can not serialize the table of {type(rulebook).__name__}')
+    characters = list(rulebook.character_index)
+    if not all(isinstance(character, str) for character in characters):
+        raise TypeError('only string characters can be serialized')
+
+    # the start and accept states may have no rules at all, they get empty rows
+    states = list(rulebook.states)
+    state_index = dict(rulebook.state_index)
+    for state in [factory.start_state] + list(factory.accept_states):
+        if state not in state_index:
+            state_index[state] = len(states)
+            states.append(state)
+    table = array('i', rulebook.table) + array('i', [-1]) * ((len(states) - len(rulebook.states)) * rulebook.width)
+    accept_states = array('i', sorted(state_index[state] for state in factory.accept_states))
+
+    writer = Writer(DFA, len(states), state_index[factory.start_state], len(accept_states), 0)
+    writer.strings(characters)
+    writer.ints(accept_states)
+    writer.ints(table)
+    return bytes(writer.data)
+
+
+def load_dfa(reader):
+    count, start_state, accept_count, _ = reader.fields
+    characters = reader.strings()
+    accept_states = reader.ints(accept_count).tolist()
+    table = reader.ints(count * len(characters))
+    rulebook = CompiledDFARuleBook.from_table(range(count), characters, table)
+    return DFAFactory(start_state, accept_states, rulebook)
+
+
+def dump_nfa(factory):
+    # every rule is three int32: state, character or -1 for a free move, and next state
+    states = Table()
+    characters = Table()
+    start_state = states(factory.start_state)
+    rules = array('i')
+    for rule in factory.rulebook.rules:
+        if rule.character is not None and not isinstance(rule.character, str):
+            raise TypeError('only string characters can be serialized')
+        character = -1 if rule.character is None else characters(rule.character)
+        rules.extend((states(rule.state), character, states(rule.next_state)))
+    accept_states = array('i', [states(state) for state in factory.accept_states])
+
+    writer = Writer(NFA, len(states.indices), start_state, len(accept_states), len(rules) // 3)
+    writer.strings(characters.values())
+    writer.ints(accept_states)
+    writer.ints(rules)
+    return bytes(writer.data)
+
+
+def load_nfa(reader):
+    _, start_state, accept_count, rule_count = reader.fields
+    characters = reader.strings()
+    accept_states = reader.ints(accept_count).tolist()
+    table = reader.ints(rule_count * 3)
+    rules = [FARule(table[position], characters[table[position + 1]] if table[position + 1] >= 0 else None,
+                    table[position + 2])
+             for position in range(0, len(table), 3)]
+    return NFAFactory(start_state, accept_states, NFARuleBook(rules))
+
+
+def dumps(value) -> bytes:
+    if isinstance(value, DFAFactory):
+        return dump_dfa(value)
+    if isinstance(value, NFAFactory):
+        return dump_nfa(value)
+    return dump_node(value)
+
+
+def loads(data, module=None):
+    # data is anything with the buffer protocol, the table of a dfa keeps pointing into it
+    reader = Reader(data)
+    if reader.kind == AST:
+        return load_node(reader, module)
+    if reader.kind == DFA:
+        return load_dfa(reader)
+    if reader.kind == NFA:
+        return load_nfa(reader)
+    raise ValueError(f'unknown content kind {reader.kind}')
+
+
+def dump(value, path):
+    with open(path, 'wb') as file:
+        file.write(dumps(value))
+
+
+def load(path, module=None):
+    # a dfa is mapped instead of read, it runs on its table right where it lies in the file,
+    # and the mapping stays open for as long as that table is in use,
+    # programs and nfas are copied out of the file anyway, so they are simply read
+    with open(path, 'rb') as file:
+        header = file.read(HEADER.size)
+        if len(header) == HEADER.size and HEADER.unpack(header)[2] == DFA:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            data = header + file.read()
+    return loads(data, module)
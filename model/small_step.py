@@ -1,11 +1,16 @@
-from copy import deepcopy
+from collections import deque
 
+from model.environment import Environment
+from model.node import Node
 
-class Expression:
-    pass
+
+class Expression(Node):
+    __slots__ = ()
 
 
 class Number(Expression):
+    __slots__ = ('value',)
+
     def __init__(self, value):
         self.value = value
 
@@ -16,8 +21,13 @@ class Number(Expression):
     def reducible(self):
         return False
 
+    def evaluate(self, env):
+        return self
+
 
 class Boolean(Expression):
+    __slots__ = ('value',)
+
     def __init__(self, value):
         self.value = value
 
@@ -28,8 +38,13 @@ class Boolean(Expression):
     def reducible(self):
         return False
 
+    def evaluate(self, env):
+        return self
+
 
 class Variable(Expression):
+    __slots__ = ('name',)
+
     def __init__(self, name):
         self.name = name
 
@@ -43,8 +58,20 @@ class Variable(Expression):
     def reduce(self, env):
         return env[self.name]
 
+    def redex_child(self):
+        return None
+
+    def contract(self, env):
+        return env[self.name], env
+
+    def evaluate(self, env):
+        # reduce all the way down in one go, used when the steps themselves are not observed
+        return env[self.name]
+
 
 class Add(Expression):
+    __slots__ = ('left', 'right')
+
     def __init__(self, left, right):
         self.left = left
         self.right = right
@@ -65,8 +92,22 @@ class Add(Expression):
         else:
             return Number(self.left.value + self.right.value)
 
+    def redex_child(self):
+        if self.left.reducible:
+            return 'left'
+        elif self.right.reducible:
+            return 'right'
+
+    def contract(self, env):
+        return Number(self.left.value + self.right.value), env
+
+    def evaluate(self, env):
+        return Number(self.left.evaluate(env).value + self.right.evaluate(env).value)
+
 
 class Multiply(Expression):
+    __slots__ = ('left', 'right')
+
     def __init__(self, left, right):
         self.left = left
         self.right = right
@@ -86,8 +127,22 @@ class Multiply(Expression):
         else:
             return Number(self.left.value * self.right.value)
 
+    def redex_child(self):
+        if self.left.reducible:
+            return 'left'
+        elif self.right.reducible:
+            return 'right'
+
+    def contract(self, env):
+        return Number(self.left.value * self.right.value), env
+
+    def evaluate(self, env):
+        return Number(self.left.evaluate(env).value * self.right.evaluate(env).value)
+
 
 class LessThan(Expression):
+    __slots__ = ('left', 'right')
+
     def __init__(self, left, right):
         self.left = left
         self.right = right
@@ -107,25 +162,36 @@ class LessThan(Expression):
         else:
             return Boolean(self.left.value < self.right.value)
 
+    def redex_child(self):
+        if self.left.reducible:
+            return 'left'
+        elif self.right.reducible:
+            return 'right'
+
+    def contract(self, env):
+        return Boolean(self.left.value < self.right.value), env
 
-class Statement:
-    pass
+    def evaluate(self, env):
+        return Boolean(self.left.evaluate(env).value < self.right.evaluate(env).value)
+
+
+class Statement(Node):
+    __slots__ = ()
 
 
 class DoNothing(Statement):
+    __slots__ = ()
 
     def __repr__(self):
         return '<do-nothing>'
 
-    def __eq__(self, other):
-        return isinstance(other, DoNothing)
-
     @property
     def reducible(self):
         return False
 
 
 class Assign(Statement):
+    __slots__ = ('name', 'expression')
 
     def __init__(self, name, expression):
         self.name = name
@@ -142,13 +208,24 @@ class Assign(Statement):
         if self.expression.reducible:
             return Assign(self.name, self.expression.reduce(env)), env
         else:
-            new_env = deepcopy(env)
-            new_env[self.name] = self.expression
+            # a persistent env, so the previous step still sees its own bindings
+            return DoNothing(), Environment.wrap(env).set(self.name, self.expression)
 
-            return DoNothing(), new_env
+    def redex_child(self):
+        if self.expression.reducible:
+            return 'expression'
+
+    def contract(self, env):
+        return DoNothing(), Environment.wrap(env).set(self.name, self.expression)
+
+    def fast_reduce(self, env):
+        # the same as reduce, but the expression is evaluated in one step
+        return DoNothing(), Environment.wrap(env).set(self.name, self.expression.evaluate(env))
 
 
 class IF(Statement):
+    __slots__ = ('condition', 'consequence', 'alternative')
+
     def __init__(self, condition, consequence, alternative):
         self.condition = condition
         self.consequence = consequence
@@ -172,8 +249,25 @@ class IF(Statement):
             else:
                 return self.alternative, env
 
+    def redex_child(self):
+        if self.condition.reducible:
+            return 'condition'
+
+    def contract(self, env):
+        if self.condition.value is True:
+            return self.consequence, env
+        else:
+            return self.alternative, env
+
+    def fast_reduce(self, env):
+        if self.condition.evaluate(env).value is True:
+            return self.consequence, env
+        else:
+            return self.alternative, env
+
 
 class Sequence(Statement):
+    __slots__ = ('first', 'second')
 
     def __init__(self, first, second):
         self.first = first
@@ -193,8 +287,25 @@ class Sequence(Statement):
             reduced_first, env = self.first.reduce(env)
             return Sequence(reduced_first, self.second), env
 
+    def redex_child(self):
+        if not isinstance(self.first, DoNothing):
+            return 'first'
+
+    def contract(self, env):
+        return self.second, env
+
+    def fast_reduce(self, env):
+        if isinstance(self.first, DoNothing):
+            return self.second, env
+        reduced_first, env = self.first.fast_reduce(env)
+        if isinstance(reduced_first, DoNothing):
+            # skip the step which only drops the finished first statement
+            return self.second, env
+        return Sequence(reduced_first, self.second), env
+
 
 class While(Statement):
+    __slots__ = ('condition', 'body')
 
     def __init__(self, condition, body):
         self.condition = condition
@@ -211,38 +322,187 @@ class While(Statement):
         # just do once IF statement and make it again with env changed
         return IF(self.condition, Sequence(self.body, self), DoNothing()), env
 
+    def redex_child(self):
+        return None
+
+    def contract(self, env):
+        return IF(self.condition, Sequence(self.body, self), DoNothing()), env
+
+    def fast_reduce(self, env):
+        # check the condition right away instead of building the IF wrapper
+        if self.condition.evaluate(env).value is True:
+            return Sequence(self.body, self), env
+        else:
+            return DoNothing(), env
+
+
+def plug(focus, path):
+    # put the focus back into its ancestors
+    node = focus
+    while path is not None:
+        parent, field, path = path
+        node = parent.replace(field, node)
+    return node
+
+
+class Zipper:
+    def __init__(self, node, env):
+        # the focus is the subtree being reduced, the path holds its ancestors with the field
+        # leading down to it, ancestors are only rebuilt when the focus moves back up,
+        # the path is a linked list of (parent, field, rest) that is never changed, so a step can share it
+        self.focus = node
+        self.path = None
+        self.env = env
+
+    @property
+    def node(self):
+        return plug(self.focus, self.path)
+
+    @property
+    def reducible(self):
+        # every node with a child is reducible
+        return self.path is not None or self.focus.reducible
+
+    def step(self):
+        # go down to the leftmost redex, contract it, and move up once the result can't be reduced anymore
+        focus = self.focus
+        path = self.path
+        field = focus.redex_child()
+        while field is not None:
+            path = (focus, field, path)
+            focus = getattr(focus, field)
+            field = focus.redex_child()
+        focus, self.env = focus.contract(self.env)
+        if not focus.reducible and path is not None:
+            parent, field, path = path
+            focus = parent.replace(field, focus)
+        self.focus = focus
+        self.path = path
+
+
+class TraceStep:
+    def __init__(self, number, focus, env=None, path=None):
+        # nodes, paths and envs are never changed after a step, so keeping them is enough,
+        # the whole node and the reprs are only built when the step is rendered
+        self.number = number
+        self.focus = focus
+        self.path = path
+        self.env = env
+
+    @property
+    def node(self):
+        return plug(self.focus, self.path)
+
+    def render(self):
+        if self.env is None:
+            return repr(self.node)
+        return f'{self.node}\n{self.env}'
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}: {self.number}'
+
+
+class Trace:
+    def __init__(self, size=None):
+        # keep only the last size steps, or all of them
+        self.steps = deque(maxlen=size)
+
+    def record(self, steps):
+        # consume the steps, whatever was recorded stays available if a step fails
+        for step in steps:
+            self.steps.append(step)
+        return self
+
+    def dump(self):
+        return '\n'.join(step.render() for step in self.steps)
+
 
 class ExpressionMachine:
     def __init__(self, expression, env=None):
-        self.expression = expression
         if env is None:
             env = {}
-        self.env = env
+        self.zipper = Zipper(expression, env)
+
+    @property
+    def expression(self):
+        return self.zipper.node
+
+    @expression.setter
+    def expression(self, expression):
+        self.zipper = Zipper(expression, self.env)
+
+    @property
+    def env(self):
+        return self.zipper.env
+
+    @env.setter
+    def env(self, env):
+        self.zipper.env = env
 
     def step(self):
-        self.expression = self.expression.reduce(self.env)
+        # the same step as reduce, but only the context around the redex is rebuilt
+        self.zipper.step()
+
+    def trace(self):
+        # yield every expression on the way, including the last one
+        number = 0
+        while self.zipper.reducible:
+            yield TraceStep(number, self.zipper.focus, path=self.zipper.path)
+            self.step()
+            number += 1
+        yield TraceStep(number, self.zipper.focus, path=self.zipper.path)
 
     def run(self):
-        while self.expression.reducible:
-            print(self.expression)
-            self.step()
-        print(self.expression)
+        for step in self.trace():
+            print(step.render())
 
 
 class StatementMachine:
     def __init__(self, statement, env=None):
-        self.statement = statement
         if env is None:
             env = {}
-        self.env = env
+        self.zipper = Zipper(statement, env)
+
+    @property
+    def statement(self):
+        return self.zipper.node
+
+    @statement.setter
+    def statement(self, statement):
+        self.zipper = Zipper(statement, self.env)
+
+    @property
+    def env(self):
+        return self.zipper.env
+
+    @env.setter
+    def env(self, env):
+        self.zipper.env = env
 
     def step(self):
-        self.statement, self.env = self.statement.reduce(self.env)
+        # the same step as reduce, but only the context around the redex is rebuilt
+        self.zipper.step()
+
+    def trace(self):
+        # yield every statement and env on the way, including the last ones
+        number = 0
+        while self.zipper.reducible:
+            yield TraceStep(number, self.zipper.focus, self.env, self.zipper.path)
+            self.step()
+            number += 1
+        yield TraceStep(number, self.zipper.focus, self.env, self.zipper.path)
 
     def run(self):
-        while self.statement.reducible:
-            print(self.statement)
-            print(self.env)
-            self.step()
-        print(self.statement)
-        print(self.env)
+        for step in self.trace():
+            print(step.render())
+
+    def run_to_completion(self, max_steps=None):
+        # run without printing and evaluate whole expressions in one step,
+        # stop early after max_steps steps
+        statement, env = self.statement, self.env
+        steps = 0
+        while statement.reducible and (max_steps is None or steps < max_steps):
+            statement, env = statement.fast_reduce(env)
+            steps += 1
+        self.zipper = Zipper(statement, env)
+        return statement, env, steps
@@ -1,7 +1,23 @@
+import codecs
+import mmap
+from array import array
+from collections import OrderedDict, defaultdict
 from typing import List, Sequence
 from itertools import chain
 
 
+CHUNK_SIZE = 1 << 16
+
+
+def decode(data, decoder=None, final=False):
+    # a whole piece of utf-8, or the next chunk of it, final says no more chunks follow,
+    # None when the bytes are not utf-8, which no automaton accepts
+    try:
+        return str(data, 'utf-8') if decoder is None else decoder.decode(data, final)
+    except UnicodeDecodeError:
+        return None
+
+
 class FARule:
 
     def __init__(self, state, character, next_state):
@@ -25,19 +41,234 @@ class DFARuleBook:
 
     def __init__(self, rules: List[FARule]):
         self.rules = rules
+        self.build_index()
+
+    def build_index(self):
+        # map every (state, character) to its rules, the first one is used
+        self.index = {}
+        for rule in self.rules:
+            self.index_rule(rule)
+
+    def index_rule(self, rule):
+        key = (rule.state, rule.character)
+        self.index[key] = self.index.get(key, ()) + (rule,)
+
+    def add_rule(self, rule):
+        self.rules.append(rule)
+        self.index_rule(rule)
+
+    def remove_rule(self, rule):
+        self.rules.remove(rule)
+        key = (rule.state, rule.character)
+        rules = tuple(_rule for _rule in self.index[key] if _rule is not rule)
+        if rules:
+            self.index[key] = rules
+        else:
+            del self.index[key]
 
     def rule_for(self, state, character):
         # search for and return the right rule
-        for rule in self.rules:
-            if rule.applies_to(state, character):
-                return rule
+        rules = self.index.get((state, character))
+        if rules:
+            return rules[0]
 
     def next_state(self, state, character):
-        # transfer to next state
-        return self.rule_for(state, character).follow()
+        # transfer to next state, None means there is no rule and the dfa is dead
+        rule = self.rule_for(state, character)
+        if rule is None:
+            return None
+        return rule.follow()
+
+    def follow_string(self, state, string):
+        # transfer through the whole string, stop as soon as the dfa is dead
+        for character in string:
+            if state is None:
+                break
+            state = self.next_state(state, character)
+        return state
+
+    def follow_bytes(self, state, data, decoder=None, final=False):
+        # bytes are utf-8, a decoder carries a character split between two chunks over to the next one
+        string = decode(data, decoder, final)
+        return None if string is None else self.follow_string(state, string)
+
+    def alphabet(self):
+        # collect all characters in order of appearance
+        return list(OrderedDict.fromkeys(rule.character for rule in self.rules))
+
+    def compile(self):
+        # a copy of the rules, so that changing the compiled rulebook leaves this one alone
+        return CompiledDFARuleBook(list(self.rules))
 
 
-class DFA:
+class CompiledDFARuleBook(DFARuleBook):
+
+    def __init__(self, rules: List[FARule]):
+        super().__init__(rules)
+        self.build()
+
+    def build(self):
+        # intern states and characters into integers, and build a dense transition table
+        # where -1 marks a (state, character) pair without any rule
+        self.states = []
+        self.state_index = {}
+        self.character_index = {}
+        for rule in self.rules:
+            for state in (rule.state, rule.next_state):
+                if state not in self.state_index:
+                    self.state_index[state] = len(self.states)
+                    self.states.append(state)
+            if rule.character not in self.character_index:
+                self.character_index[rule.character] = len(self.character_index)
+
+        self.width = len(self.character_index)
+        self.build_byte_columns()
+        self.table = array('i', [-1]) * (len(self.states) * self.width)
+        self.table_rules = [None] * len(self.table)
+        for rule in self.rules:
+            position = self.state_index[rule.state] * self.width + self.character_index[rule.character]
+            # the first matching rule wins, just like the linear scan
+            if self.table[position] == -1:
+                self.table[position] = self.state_index[rule.next_state]
+                self.table_rules[position] = rule
+
+    @classmethod
+    def from_table(cls, states, characters, table):
+        # a rulebook around a ready table, like a memoryview into a mapped file, nothing is copied
+        # and the rules are only built from the table once something asks for them
+        rulebook = cls.__new__(cls)
+        rulebook.states = list(states)
+        rulebook.state_index = {state: index for index, state in enumerate(rulebook.states)}
+        rulebook.character_index = {character: column for column, character in enumerate(characters)}
+        rulebook.width = len(rulebook.character_index)
+        rulebook.build_byte_columns()
+        rulebook.table = table
+        return rulebook
+
+    def build_byte_columns(self):
+        # utf-8 bytes below 0x80 are the ascii characters themselves, so an ascii alphabet runs on raw bytes,
+        # every other byte is part of a character it doesn't have
+        self.byte_columns = array('i', [-1]) * 256
+        self.ascii = True
+        for character, column in self.character_index.items():
+            if isinstance(character, str):
+                if len(character) == 1 and ord(character) < 0x80:
+                    self.byte_columns[ord(character)] = column
+                else:
+                    self.ascii = False
+
+    def __getattr__(self, name):
+        if name not in ('rules', 'index', 'table_rules'):
+            raise AttributeError(name)
+        characters = list(self.character_index)
+        self.rules = []
+        self.table_rules = [None] * len(self.table)
+        for position, next_index in enumerate(self.table):
+            if next_index >= 0:
+                rule = FARule(self.states[position // self.width], characters[position % self.width],
+                              self.states[next_index])
+                self.rules.append(rule)
+                self.table_rules[position] = rule
+        self.build_index()
+        return getattr(self, name)
+
+    def rule_for(self, state, character):
+        index = self.state_index.get(state)
+        column = self.character_index.get(character)
+        if index is None or column is None:
+            return None
+        return self.table_rules[index * self.width + column]
+
+    def follow_string(self, state, string):
+        index = self.state_index.get(state)
+        if index is None:
+            # a state without any rule has no row, it only survives the empty input
+            return state if not len(string) else None
+        table = self.table
+        width = self.width
+        character_index = self.character_index
+        for character in string:
+            if index < 0:
+                break
+            column = character_index.get(character)
+            if column is None:
+                index = -1
+                break
+            index = table[index * width + column]
+        return self.states[index] if index >= 0 else None
+
+    def follow_bytes(self, state, data, decoder=None, final=False):
+        # an ascii table never feeds the decoder, every byte it has no column for is dead already
+        if not self.ascii:
+            return super().follow_bytes(state, data, decoder, final)
+        index = self.state_index.get(state)
+        if index is None:
+            # a state without any rule has no row, it only survives the empty input
+            return state if not len(data) else None
+        table = self.table
+        width = self.width
+        byte_columns = self.byte_columns
+        for byte in data:
+            if index < 0:
+                break
+            column = byte_columns[byte]
+            if column < 0:
+                index = -1
+                break
+            index = table[index * width + column]
+        return self.states[index] if index >= 0 else None
+
+    def add_rule(self, rule):
+        super().add_rule(rule)
+        self.build()
+
+    def remove_rule(self, rule):
+        super().remove_rule(rule)
+        self.build()
+
+    def compile(self):
+        return self
+
+
+class StreamReader:
+    # reading stops as soon as dead() says no input can make the automaton accept anymore
+
+    def read_stream(self, fileobj, chunk_size=CHUNK_SIZE):
+        # feed the automaton chunk by chunk, text chunks are read as strings and binary chunks as utf-8 bytes
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        while not self.dead():
+            chunk = fileobj.read(chunk_size)
+            if not chunk:
+                break
+            if isinstance(chunk, str):
+                self.read_string(chunk)
+            else:
+                self.read_bytes(chunk, decoder)
+        # a character cut off at the end of the stream is not utf-8 either
+        if not self.dead():
+            self.read_bytes(b'', decoder, True)
+
+    def read_file(self, path, chunk_size=CHUNK_SIZE):
+        # map the file into memory and read slices of it without copying
+        with open(path, 'rb') as file:
+            file.seek(0, 2)
+            if file.tell() == 0:
+                return
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                view = memoryview(data)
+                decoder = codecs.getincrementaldecoder('utf-8')()
+                try:
+                    for offset in range(0, len(view), chunk_size):
+                        if self.dead():
+                            break
+                        self.read_bytes(view[offset:offset + chunk_size], decoder)
+                finally:
+                    view.release()
+                if not self.dead():
+                    self.read_bytes(b'', decoder, True)
+
+
+class DFA(StreamReader):
     def __init__(self, current_state: int, accept_states: List[int], rulebook: DFARuleBook):
         self.current_state = current_state
         self.accept_states = accept_states
@@ -52,8 +283,13 @@ class DFA:
         self.current_state = self.rulebook.next_state(self.current_state, character)
 
     def read_string(self, string):
-        for s in string:
-            self.read_character(s)
+        self.current_state = self.rulebook.follow_string(self.current_state, string)
+
+    def read_bytes(self, data, decoder=None, final=False):
+        self.current_state = self.rulebook.follow_bytes(self.current_state, data, decoder, final)
+
+    def dead(self):
+        return self.current_state is None
 
 
 class DFAFactory:
@@ -71,29 +307,280 @@ class DFAFactory:
         dfa.read_string(string)
         return dfa.accepting()
 
+    def accept_stream(self, fileobj, chunk_size=CHUNK_SIZE):
+        dfa = self.get_dfa()
+        dfa.read_stream(fileobj, chunk_size)
+        return dfa.accepting()
+
+    def accept_file(self, path, chunk_size=CHUNK_SIZE):
+        dfa = self.get_dfa()
+        dfa.read_file(path, chunk_size)
+        return dfa.accepting()
+
+    def accept_many(self, strings):
+        # share one compiled rulebook across all strings
+        rulebook = self.rulebook.compile()
+        accepted = []
+        for string in strings:
+            dfa = DFA(self.start_state, self.accept_states, rulebook)
+            dfa.read_string(string)
+            accepted.append(dfa.accepting())
+        return accepted
+
+    def compile(self):
+        # generate a same factory backed by the dense transition table
+        return DFAFactory(self.start_state, self.accept_states, self.rulebook.compile())
+
+    def minimize(self):
+        # hopcroft partition refinement, return the minimal factory and a report
+        alphabet = self.rulebook.alphabet()
+
+        # explore reachable states, None is the dead state every missing rule leads to,
+        # it is always explored so that states which can never accept fall into its block
+        states = [self.start_state, None]
+        seen = {self.start_state, None}
+        transitions = {}
+        inverse = defaultdict(set)
+        for state in states:
+            for character in alphabet:
+                next_state = self.rulebook.next_state(state, character) if state is not None else None
+                transitions[(state, character)] = next_state
+                inverse[(next_state, character)].add(state)
+                if next_state not in seen:
+                    seen.add(next_state)
+                    states.append(next_state)
+
+        accepting = {state for state in states if state is not None and state in self.accept_states}
+        blocks = [block for block in (set(accepting), set(states) - accepting) if block]
+        block_of = {state: index for index, block in enumerate(blocks) for state in block}
+        work = set(range(len(blocks)))
+        while work:
+            splitter = set(blocks[work.pop()])
+            for character in alphabet:
+                # split every block by whether its states move into the splitter
+                touched = defaultdict(set)
+                for state in splitter:
+                    for previous in inverse.get((state, character), ()):
+                        touched[block_of[previous]].add(previous)
+                for index, moved in touched.items():
+                    if len(moved) == len(blocks[index]):
+                        continue
+                    blocks[index] -= moved
+                    blocks.append(moved)
+                    for state in moved:
+                        block_of[state] = len(blocks) - 1
+                    if index in work or len(moved) < len(blocks[index]):
+                        work.add(len(blocks) - 1)
+                    else:
+                        work.add(index)
+
+        # every block is named after its first reachable state, blocks equivalent to dead are dropped
+        dead = block_of.get(None)
+        representative = {}
+        for state in states:
+            representative.setdefault(block_of[state], state)
+        representative[block_of[self.start_state]] = self.start_state
+
+        rules = []
+        for index, state in representative.items():
+            if index == dead:
+                continue
+            for character in alphabet:
+                next_block = block_of[transitions[(state, character)]]
+                if next_block != dead:
+                    rules.append(FARule(state, character, representative[next_block]))
+        accept_states = [state for index, state in representative.items() if index != dead and state in accepting]
+
+        rulebook = DFARuleBook(rules)
+        if isinstance(self.rulebook, CompiledDFARuleBook):
+            rulebook = rulebook.compile()
+        # a lazy rulebook has no rule list, so count the transitions it produced instead
+        known_states = seen.union(rule.state for rule in self.rulebook.rules) - {None}
+        known_rules = len(self.rulebook.rules) or sum(1 for (state, _), next_state in transitions.items()
+                                                      if state is not None and next_state is not None)
+        report = MinimizationReport(len(known_states), len(representative) - (dead is not None),
+                                    known_rules, len(rules))
+        return DFAFactory(self.start_state, accept_states, rulebook), report
+
+
+class MinimizationReport:
+    def __init__(self, states_before, states_after, rules_before, rules_after):
+        self.states_before = states_before
+        self.states_after = states_after
+        self.rules_before = rules_before
+        self.rules_after = rules_after
+
+    @property
+    def states_removed(self):
+        return self.states_before - self.states_after
+
+    @property
+    def rules_removed(self):
+        return self.rules_before - self.rules_after
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}: {self.states_before} --> {self.states_after} states, ' \
+            f'{self.rules_before} --> {self.rules_after} rules'
+
 
 class NFARuleBook:
     def __init__(self, rules: List[FARule]):
         self.rules = rules
+        self.build_index()
+
+    def build_index(self):
+        # map every (state, character) to its rules and the frozenset of their next states,
+        # free moves are rules without character, their closures are cached per state
+        self.index = {}
+        self.targets = {}
+        self.closures = {}
+        self.moves = {}
+        for rule in self.rules:
+            self.index_rule(rule)
+
+    def index_rule(self, rule):
+        key = (rule.state, rule.character)
+        self.index[key] = self.index.get(key, ()) + (rule,)
+        self.targets[key] = self.targets.get(key, frozenset()) | {rule.follow()}
+        self.forget(rule)
+
+    def forget(self, rule):
+        # a free move can change any closure, other rules only change their own moves
+        if rule.character is None:
+            self.closures.clear()
+            self.moves.clear()
+        else:
+            self.moves.pop((rule.state, rule.character), None)
+
+    def add_rule(self, rule):
+        self.rules.append(rule)
+        self.index_rule(rule)
+
+    def remove_rule(self, rule):
+        self.rules.remove(rule)
+        key = (rule.state, rule.character)
+        rules = tuple(_rule for _rule in self.index[key] if _rule is not rule)
+        if rules:
+            self.index[key] = rules
+            self.targets[key] = frozenset(_rule.follow() for _rule in rules)
+        else:
+            del self.index[key]
+            del self.targets[key]
+        self.forget(rule)
 
     def rule_for(self, state, character) -> Sequence:
         # collect all rules meet the state and character
-        return [rule for rule in self.rules if rule.applies_to(state, character)]
+        return self.index.get((state, character), ())
 
     def follow_rules_for(self, state, character) -> Sequence:
         # gather all states after one state transfer to next state
-        return [rule.follow() for rule in self.rule_for(state, character)]
+        return self.targets.get((state, character), frozenset())
+
+    def free_moves_for(self, state):
+        # all states reachable from this state by free moves, including itself
+        closure = self.closures.get(state)
+        if closure is None:
+            closure = {state}
+            pending = [state]
+            while pending:
+                for next_state in self.follow_rules_for(pending.pop(), None):
+                    if next_state not in closure:
+                        closure.add(next_state)
+                        pending.append(next_state)
+            closure = self.closures[state] = frozenset(closure)
+        return closure
+
+    def follow_free_moves(self, states):
+        return frozenset().union(*[self.free_moves_for(state) for state in states])
+
+    def follow_moves_for(self, state, character):
+        # the next states of one state, already closed under free moves
+        key = (state, character)
+        moves = self.moves.get(key)
+        if moves is None:
+            moves = self.moves[key] = self.follow_free_moves(self.follow_rules_for(state, character))
+        return moves
 
     def next_states(self, states, character):
         # return all possible states
-        return set(_state
-                   for state in states
-                   for _state in self.follow_rules_for(state, character))
+        moves = self.moves
+        return set().union(*[moves[(state, character)] if (state, character) in moves
+                             else self.follow_moves_for(state, character)
+                             for state in states])
+
+    def follow_bytes(self, states, data, decoder=None, final=False):
+        # bytes are utf-8, a decoder carries a character split between two chunks over to the next one
+        string = decode(data, decoder, final)
+        if string is None:
+            return set()
+        for character in string:
+            if not states:
+                break
+            states = self.next_states(states, character)
+        return states
+
+    def alphabet(self):
+        # collect all characters in order of appearance
+        return list(OrderedDict.fromkeys(rule.character for rule in self.rules if rule.character is not None))
+
+
+class LazyDFARuleBook(DFARuleBook):
+
+    def __init__(self, rulebook: NFARuleBook, cache_size=1024):
+        # determinize the nfa on the fly, every state is a frozenset of nfa states
+        super().__init__([])
+        self.rulebook = rulebook
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
 
+    def next_state(self, state, character):
+        if state is None:
+            return None
+        key = (state, character)
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            return self.cache[key]
+
+        next_state = self.subset(state, character)
+        self.cache[key] = next_state
+        if self.cache_size is not None and len(self.cache) > self.cache_size:
+            # drop the least recently used subset
+            self.cache.popitem(last=False)
+        return next_state
+
+    def subset(self, state, character):
+        # the empty subset is the dead state
+        return frozenset(self.rulebook.next_states(state, character)) or None
+
+    def rule_for(self, state, character):
+        next_state = self.next_state(state, character)
+        if next_state is not None:
+            return FARule(state, character, next_state)
+
+    def alphabet(self):
+        return self.rulebook.alphabet()
+
+    def compile(self):
+        # there is no finite rule list to compile
+        return self
+
+
+class AcceptingSubsets:
+
+    def __init__(self, accept_states):
+        # a subset is accepted as soon as it contains any accept state of the nfa
+        self.accept_states = frozenset(accept_states)
+
+    def __contains__(self, state):
+        return state is not None and not self.accept_states.isdisjoint(state)
 
-class NFA:
+    def __repr__(self):
+        return f'{self.__class__.__name__}: {set(self.accept_states)}'
+
+
+class NFA(StreamReader):
     def __init__(self, current_states: set, accept_states: set, rulebook: NFARuleBook):
-        self.current_states = current_states
+        self.current_states = set(rulebook.follow_free_moves(current_states))
         self.accept_states = accept_states
         self.rulebook = rulebook
 
@@ -109,6 +596,12 @@ class NFA:
         for s in string:
             self.read_character(s)
 
+    def read_bytes(self, data, decoder=None, final=False):
+        self.current_states = self.rulebook.follow_bytes(self.current_states, data, decoder, final)
+
+    def dead(self):
+        return not self.current_states
+
 
 class NFAFactory:
     def __init__(self, start_state: int, accept_states: List[int], rulebook: NFARuleBook):
@@ -124,3 +617,172 @@ class NFAFactory:
         dfa = self.get_dfa()
         dfa.read_string(string)
         return dfa.accepting()
+
+    def accept_stream(self, fileobj, chunk_size=CHUNK_SIZE):
+        nfa = self.get_dfa()
+        nfa.read_stream(fileobj, chunk_size)
+        return nfa.accepting()
+
+    def accept_file(self, path, chunk_size=CHUNK_SIZE):
+        nfa = self.get_dfa()
+        nfa.read_file(path, chunk_size)
+        return nfa.accepting()
+
+    def accept_many(self, strings, cache_size=1024):
+        # determinize lazily once, so subsets reached by one string are reused by the others
+        return self.to_dfa(lazy=True, cache_size=cache_size).accept_many(strings)
+
+    def to_dfa(self, lazy=False, cache_size=1024):
+        # subset construction, every dfa state is a frozenset of nfa states
+        start_state = frozenset(self.get_dfa().current_states)
+        if lazy:
+            return DFAFactory(start_state, AcceptingSubsets(self.accept_states),
+                              LazyDFARuleBook(self.rulebook, cache_size))
+
+        alphabet = self.rulebook.alphabet()
+        states = [start_state]
+        seen = {start_state}
+        rules = []
+        for state in states:
+            for character in alphabet:
+                next_state = frozenset(self.rulebook.next_states(state, character))
+                if not next_state:
+                    # leave the dead state out, a missing rule already means it
+                    continue
+                rules.append(FARule(state, character, next_state))
+                if next_state not in seen:
+                    seen.add(next_state)
+                    states.append(next_state)
+
+        accepting = AcceptingSubsets(self.accept_states)
+        accept_states = [state for state in states if state in accepting]
+        return DFAFactory(start_state, accept_states, DFARuleBook(rules))
+
+    def to_bitset(self):
+        # generate a same factory simulated with bitmasks
+        # a copy of the rules, so that changing the bitset rulebook leaves this one alone
+        return BitsetNFAFactory(self.start_state, self.accept_states, BitsetNFARuleBook(list(self.rulebook.rules)))
+
+
+class BitsetNFARuleBook(NFARuleBook):
+
+    def __init__(self, rules: List[FARule]):
+        super().__init__(rules)
+        self.build_masks()
+
+    def build_masks(self):
+        # number the states, then for every character precompute the successor mask
+        # of each state, grouped into tables indexed by one byte of the current mask
+        self.states = []
+        self.state_index = {}
+        for rule in self.rules:
+            self.index_of(rule.state)
+            self.index_of(rule.next_state)
+
+        self.masks = {}
+        for character in self.alphabet():
+            successors = [self.mask_for(self.follow_moves_for(state, character)) for state in self.states]
+            tables = []
+            for offset in range(0, len(successors), 8):
+                chunk = successors[offset:offset + 8]
+                if not any(chunk):
+                    tables.append(None)
+                    continue
+                table = [0] * 256
+                for byte in range(1, 256):
+                    # reuse the table entry without the lowest bit
+                    lowest = (byte & -byte).bit_length() - 1
+                    table[byte] = table[byte & (byte - 1)] | (chunk[lowest] if lowest < len(chunk) else 0)
+                tables.append(table)
+            self.masks[character] = tables
+
+    def index_of(self, state):
+        # states outside of the rules still get a bit, they just never move
+        if state not in self.state_index:
+            self.state_index[state] = len(self.states)
+            self.states.append(state)
+        return self.state_index[state]
+
+    def mask_for(self, states):
+        mask = 0
+        for state in states:
+            mask |= 1 << self.index_of(state)
+        return mask
+
+    def states_for(self, mask):
+        states = set()
+        index = 0
+        while mask:
+            if mask & 1:
+                states.add(self.states[index])
+            mask >>= 1
+            index += 1
+        return states
+
+    def next_mask(self, mask, character):
+        # or together the successors of every active state, one byte of the mask at a time
+        tables = self.masks.get(character)
+        if tables is None:
+            return 0
+        next_mask = 0
+        for table in tables:
+            if not mask:
+                break
+            if table is not None:
+                next_mask |= table[mask & 255]
+            mask >>= 8
+        return next_mask
+
+    def follow_string_mask(self, mask, string):
+        for character in string:
+            if not mask:
+                break
+            mask = self.next_mask(mask, character)
+        return mask
+
+    def follow_bytes_mask(self, mask, data, decoder=None, final=False):
+        string = decode(data, decoder, final)
+        return 0 if string is None else self.follow_string_mask(mask, string)
+
+    def add_rule(self, rule):
+        super().add_rule(rule)
+        self.build_masks()
+
+    def remove_rule(self, rule):
+        super().remove_rule(rule)
+        self.build_masks()
+
+
+class BitsetNFA(StreamReader):
+    def __init__(self, current_states: set, accept_states: set, rulebook: BitsetNFARuleBook):
+        self.rulebook = rulebook
+        self.current_mask = rulebook.mask_for(rulebook.follow_free_moves(current_states))
+        self.accept_mask = rulebook.mask_for(accept_states)
+
+    @property
+    def current_states(self):
+        return self.rulebook.states_for(self.current_mask)
+
+    def accepting(self):
+        # determine if it can be accepted
+        return bool(self.current_mask & self.accept_mask)
+
+    def read_character(self, character):
+        self.current_mask = self.rulebook.next_mask(self.current_mask, character)
+
+    def read_string(self, string):
+        self.current_mask = self.rulebook.follow_string_mask(self.current_mask, string)
+
+    def read_bytes(self, data, decoder=None, final=False):
+        self.current_mask = self.rulebook.follow_bytes_mask(self.current_mask, data, decoder, final)
+
+    def dead(self):
+        return not self.current_mask
+
+
+class BitsetNFAFactory(NFAFactory):
+
+    def get_dfa(self):
+        # generate a new bitset nfa
+        return BitsetNFA({self.start_state}, set(self.accept_states), self.rulebook)
+
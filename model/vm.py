@@ -0,0 +1,186 @@
+import sys
+from array import array
+
+
+# every instruction is four ints: opcode and three slot or address operands
+OPCODE_NAMES = ('MOVE', 'ADD', 'MULTIPLY', 'LESS_THAN', 'JUMP', 'JUMP_UNLESS', 'HALT')
+MOVE, ADD, MULTIPLY, LESS_THAN, JUMP, JUMP_UNLESS, HALT = range(len(OPCODE_NAMES))
+WIDTH = 4
+
+
+class Program:
+    def __init__(self, code, names, constants, size, result, module):
+        self.code = code
+        # slot -> variable name, and slot -> constant value, the rest of the slots are temporaries
+        self.names = names
+        self.constants = constants
+        self.size = size
+        # the slot holding the value of an expression program, None for statements
+        self.result = result
+        self.module = module
+
+    def __repr__(self):
+        lines = []
+        for pc in range(0, len(self.code), WIDTH):
+            opcode, a, b, c = self.code[pc:pc + WIDTH]
+            lines.append(f'{pc}: {OPCODE_NAMES[opcode]} {a} {b} {c}')
+        return '\n'.join(lines)
+
+    def wrap(self, value):
+        if isinstance(value, bool):
+            return self.module.Boolean(value)
+        return self.module.Number(value)
+
+    def run(self, env=None):
+        # load the env and the constant pool into a flat slot array, then dispatch until HALT
+        if env is None:
+            env = {}
+        slots = [None] * self.size
+        for slot, value in self.constants.items():
+            slots[slot] = value
+        for slot, name in self.names.items():
+            if name in env:
+                slots[slot] = env[name].value
+
+        code = self.code
+        pc = 0
+        while True:
+            opcode = code[pc]
+            if opcode == ADD:
+                slots[code[pc + 1]] = slots[code[pc + 2]] + slots[code[pc + 3]]
+                pc += WIDTH
+            elif opcode == LESS_THAN:
+                slots[code[pc + 1]] = slots[code[pc + 2]] < slots[code[pc + 3]]
+                pc += WIDTH
+            elif opcode == JUMP_UNLESS:
+                if slots[code[pc + 1]] is True:
+                    pc += WIDTH
+                else:
+                    pc = code[pc + 2]
+            elif opcode == JUMP:
+                pc = code[pc + 1]
+            elif opcode == MULTIPLY:
+                slots[code[pc + 1]] = slots[code[pc + 2]] * slots[code[pc + 3]]
+                pc += WIDTH
+            elif opcode == MOVE:
+                slots[code[pc + 1]] = slots[code[pc + 2]]
+                pc += WIDTH
+            else:
+                break
+
+        if self.result is not None:
+            return self.wrap(slots[self.result])
+        new_env = dict(env)
+        for slot, name in self.names.items():
+            if slots[slot] is not None:
+                new_env[name] = self.wrap(slots[slot])
+        return new_env
+
+
+class Compiler:
+    def __init__(self):
+        self.code = array('i')
+        self.variables = {}
+        self.constants = {}
+        self.free = []
+        self.size = 0
+
+    def allocate(self):
+        self.size += 1
+        return self.size - 1
+
+    def variable(self, name):
+        if name not in self.variables:
+            self.variables[name] = self.allocate()
+        return self.variables[name]
+
+    def constant(self, value):
+        # True and 1 are equal in python, so the type is part of the key
+        key = (type(value), value)
+        if key not in self.constants:
+            self.constants[key] = self.allocate()
+        return self.constants[key]
+
+    def temporary(self):
+        return self.free.pop() if self.free else self.allocate()
+
+    def release(self, slot, temporaries):
+        if slot in temporaries:
+            self.free.append(slot)
+
+    def emit(self, opcode, a=0, b=0, c=0):
+        self.code.extend((opcode, a, b, c))
+        return len(self.code) - WIDTH
+
+    def patch(self, position, operand, address):
+        self.code[position + operand] = address
+
+    def compile(self, node):
+        module = sys.modules[type(node).__module__]
+        if hasattr(module, 'Statement') and isinstance(node, module.Statement):
+            self.compile_statement(node)
+            result = None
+        else:
+            result = self.compile_expression(node, set())
+        self.emit(HALT)
+        names = {slot: name for name, slot in self.variables.items()}
+        constants = {slot: key[1] for key, slot in self.constants.items()}
+        return Program(self.code, names, constants, self.size, result, module)
+
+    def compile_expression(self, node, temporaries, target=None):
+        # return the slot holding the value, only the root of an assignment writes into its target
+        kind = type(node).__name__
+        if kind in ('Number', 'Boolean', 'Variable'):
+            slot = self.constant(node.value) if kind != 'Variable' else self.variable(node.name)
+            if target is None or target == slot:
+                return slot
+            self.emit(MOVE, target, slot)
+            return target
+
+        opcode = {'Add': ADD, 'Multiply': MULTIPLY, 'LessThan': LESS_THAN}[kind]
+        left = self.compile_expression(node.left, temporaries)
+        right = self.compile_expression(node.right, temporaries)
+        self.release(left, temporaries)
+        self.release(right, temporaries)
+        if target is None:
+            target = self.temporary()
+            temporaries.add(target)
+        self.emit(opcode, target, left, right)
+        return target
+
+    def compile_condition(self, condition):
+        # jump over the following code unless the condition is true, the jump is patched later
+        temporaries = set()
+        slot = self.compile_expression(condition, temporaries)
+        self.release(slot, temporaries)
+        return self.emit(JUMP_UNLESS, slot)
+
+    def compile_statement(self, node):
+        pending = [node]
+        while pending:
+            node = pending.pop()
+            kind = type(node).__name__
+            if kind == 'Sequence':
+                pending.append(node.second)
+                pending.append(node.first)
+            elif kind == 'Assign':
+                self.compile_expression(node.expression, set(), self.variable(node.name))
+            elif kind == 'IF':
+                unless = self.compile_condition(node.condition)
+                self.compile_statement(node.consequence)
+                end = self.emit(JUMP)
+                self.patch(unless, 2, len(self.code))
+                self.compile_statement(node.alternative)
+                self.patch(end, 1, len(self.code))
+            elif kind == 'While':
+                start = len(self.code)
+                unless = self.compile_condition(node.condition)
+                self.compile_statement(node.body)
+                self.emit(JUMP, start)
+                self.patch(unless, 2, len(self.code))
+            elif kind != 'DoNothing':
+                raise TypeError(f'can not compile {node!r}')
+
+
+def compile(node) -> Program:
+    return Compiler().compile(node)
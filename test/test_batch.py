@@ -0,0 +1,48 @@
+import unittest
+
+from model import big_step, small_step
+from model.batch import BatchRunner
+from model.parser import parse
+
+
+class BatchTestCase(unittest.TestCase):
+
+    def programs(self):
+        programs = [(f'x = 0; while (x < {n}) {{ x = x + y }}', {'y': big_step.Number(1)}) for n in range(10)]
+        programs.append(('x = z', {}))
+        programs.append((parse('while (true) { x = 1 }'), None))
+        return programs
+
+    def test_run(self):
+        for module in (big_step, small_step):
+            results = list(BatchRunner(module, workers=2, chunk_size=3, max_steps=1000).run(self.programs()))
+            self.assertEqual(sorted(result.index for result in results), list(range(12)))
+            results = {result.index: result for result in results}
+            for n in range(10):
+                self.assertEqual(results[n].status, 'done')
+                self.assertEqual(repr(results[n].env), f"{{'y': <1>, 'x': <{n}>}}")
+                self.assertIsInstance(results[n].env['x'], module.Number)
+            self.assertEqual(results[10].status, 'error')
+            self.assertEqual(results[10].error, "KeyError: 'z'")
+            self.assertEqual(results[11].status, 'steps')
+            self.assertEqual(results[11].steps, 1000)
+
+    def test_timeout(self):
+        results = list(BatchRunner(workers=1, timeout=0.01).run([('while (true) { x = 1 }', {})]))
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0].status, 'timeout')
+        self.assertGreater(results[0].steps, 0)
+
+    def test_nodes(self):
+        # nodes are sent as node tables, so numbers without source text get through,
+        # and a program that can't be sent at all doesn't stop the others
+        programs = [(big_step.Assign('x', big_step.Number(-1)), {}),
+                    (big_step.Assign('x', big_step.Number('1')), {}),
+                    ('x = 2', {}),
+                    (big_step.Assign('x', big_step.Number(2 ** 70)), {})]
+        results = sorted(BatchRunner(workers=1).run(programs), key=lambda result: result.index)
+        self.assertEqual([result.status for result in results], ['done', 'error', 'done', 'done'])
+        self.assertEqual(repr(results[0].env), "{'x': <-1>}")
+        self.assertTrue(results[1].error.startswith('ValueError'))
+        self.assertEqual(repr(results[2].env), "{'x': <2>}")
+        self.assertEqual(repr(results[3].env), f"{{'x': <{2 ** 70}>}}")
@@ -3,7 +3,7 @@ from io import StringIO
 from unittest.mock import patch
 
 from model.big_step import Number, Add, Multiply, Machine, LessThan, Variable, Assign, \
-    IF, Boolean, Sequence, While
+    IF, Boolean, Sequence, While, DoNothing, EvaluationCache, MISS_LIMIT
 
 
 class ModelTestCase(unittest.TestCase):
@@ -129,3 +129,83 @@ class ModelTestCase(unittest.TestCase):
             ).to_python() % env)
         func({'x': 2})
         self.assertEqual(globals()['env'], {'x': 6})
+
+    def test_long_while(self):
+        env = While(
+            LessThan(Variable('x'), Number(5000)),
+            Assign('x', Add(Variable('x'), Number(1)))
+        ).evaluate({'x': Number(0)})
+        self.assertEqual(env['x'].value, 5000)
+
+        statement = Assign('x', Number(0))
+        for _ in range(5000):
+            statement = Sequence(statement, Assign('x', Add(Variable('x'), Number(1))))
+        self.assertEqual(statement.evaluate({})['x'].value, 5000)
+
+    def test_to_function(self):
+        self.assertEqual(Number(5).to_function()({}), 5)
+        self.assertEqual(Boolean(True).to_function()({}), True)
+        self.assertEqual(Add(Variable('x'), Number(5)).to_function()({'x': 5}), 10)
+        self.assertEqual(Multiply(Number(5), Variable('x')).to_function()({'x': 5}), 25)
+        self.assertEqual(LessThan(Variable('x'), Variable('y')).to_function()({'x': 5, 'y': 3}), False)
+
+        env = {'x': 5}
+        self.assertEqual(Assign('x', Number(3)).to_function()(env), {'x': 3})
+        self.assertEqual(env, {'x': 5})
+
+        func = IF(
+            Variable('x'),
+            Assign('y', Number(1)),
+            Assign('y', Number(2))
+        ).to_function()
+        self.assertEqual(func({'x': True}), {'x': True, 'y': 1})
+        self.assertEqual(func({'x': 5}), {'x': 5, 'y': 2})
+
+        func = Sequence(Assign('x', Add(Number(1), Variable('x'))),
+                        Sequence(Assign('x', Multiply(Number(2), Variable('x'))), DoNothing())).to_function()
+        self.assertEqual(func({'x': 2}), {'x': 6})
+
+        # the same function runs on many environments
+        func = While(
+            LessThan(Variable('x'), Number(5)),
+            Assign('x', Multiply(Variable('x'), Number(3)))
+        ).to_function()
+        self.assertEqual(func({'x': 2}), {'x': 6})
+        self.assertEqual(func({'x': 1}), {'x': 9})
+
+    def test_evaluation_cache(self):
+        # <a * b> + <c * c> never changes inside the loop
+        statement = While(
+            LessThan(Variable('x'), Add(Multiply(Variable('a'), Variable('b')), Multiply(Variable('c'), Variable('c')))),
+            Assign('x', Add(Variable('x'), Multiply(Variable('a'), Variable('b'))))
+        )
+        env = {'a': Number(2), 'b': Number(3), 'c': Number(4), 'x': Number(0)}
+        cache = EvaluationCache()
+        self.assertEqual(statement.evaluate(env, cache), statement.evaluate(env))
+        self.assertEqual(cache.free_variables(statement.condition), ('a', 'b', 'c', 'x'))
+        # five checks and four assignments depend on x, the invariant sum is computed once,
+        # and the products of two variables are not cached at all
+        self.assertEqual(cache.misses, 5 + 4 + 1)
+
+        cache = EvaluationCache(maxsize=1)
+        self.assertEqual(statement.evaluate(env, cache), statement.evaluate(env))
+        self.assertEqual(len(cache.results), 1)
+
+        # x + <<a + 1> * <b + 2>> misses every time, it stops being cached while its invariant part stays
+        statement = While(
+            LessThan(Variable('x'), Number(1000)),
+            Assign('x', Add(Variable('x'), Multiply(Add(Variable('a'), Number(1)), Add(Variable('b'), Number(2)))))
+        )
+        cache = EvaluationCache()
+        self.assertEqual(statement.evaluate(env, cache), statement.evaluate(env))
+        self.assertEqual(cache.misses, MISS_LIMIT + 1)
+        self.assertEqual(len(cache.results), MISS_LIMIT + 1)
+
+    @patch('sys.stdout', new_callable=StringIO)
+    def test_machine_cache(self, mock_stdout):
+        Machine(Add(Variable('x'), Number(2)), {'x': Number(2)}, EvaluationCache()).run()
+        Machine(Assign('y', Multiply(Variable('x'), Number(2))), {'x': Number(2)}, EvaluationCache()).run()
+        self.assertEqual(mock_stdout.getvalue(),
+                         "<4>\n"
+                         "{'x': <2>, 'y': <4>}\n"
+                         )
@@ -0,0 +1,43 @@
+from unittest import TestCase
+
+from model.environment import Environment
+
+
+class Name(str):
+    # every name collides with each other
+    def __hash__(self):
+        return 1
+
+
+class TestEnvironment(TestCase):
+
+    def test_environment(self):
+        env = Environment({'x': 1, 'y': 2})
+        new_env = env.set('z', 3).set('x', 4)
+        self.assertEqual(env, {'x': 1, 'y': 2})
+        self.assertEqual(new_env, {'x': 4, 'y': 2, 'z': 3})
+        self.assertEqual(repr(new_env), "{'x': 4, 'y': 2, 'z': 3}")
+        self.assertEqual(repr(Environment()), '{}')
+        self.assertEqual(len(new_env), 3)
+        self.assertIn('z', new_env)
+        self.assertNotIn('z', env)
+        with self.assertRaises(KeyError):
+            env['z']
+        self.assertIs(Environment.wrap(env), env)
+
+    def test_wide_environment(self):
+        env = Environment()
+        envs = []
+        for index in range(1000):
+            env = env.set(f'x{index}', index)
+            envs.append(env)
+        self.assertEqual(list(env), [f'x{index}' for index in range(1000)])
+        self.assertEqual(env['x500'], 500)
+        self.assertEqual(len(envs[9]), 10)
+        self.assertNotIn('x10', envs[9])
+
+    def test_collision(self):
+        env = Environment({Name('a'): 1, Name('b'): 2}).set('c', 3).set(Name('a'), 4)
+        self.assertEqual(list(env.items()), [('a', 4), ('b', 2), ('c', 3)])
+        self.assertEqual(env[Name('b')], 2)
+        self.assertNotIn(Name('d'), env)
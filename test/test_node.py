@@ -0,0 +1,41 @@
+from unittest import TestCase
+
+from model import big_step, small_step
+from model.node import Interner
+
+
+class TestNode(TestCase):
+
+    def test_structural_equality(self):
+        for m in (big_step, small_step):
+            self.assertEqual(m.Add(m.Variable('x'), m.Number(1)), m.Add(m.Variable('x'), m.Number(1)))
+            self.assertEqual(hash(m.Add(m.Variable('x'), m.Number(1))), hash(m.Add(m.Variable('x'), m.Number(1))))
+            self.assertNotEqual(m.Add(m.Variable('x'), m.Number(1)), m.Multiply(m.Variable('x'), m.Number(1)))
+            self.assertNotEqual(m.Number(1), m.Number(True))
+            self.assertNotEqual(m.Number(1), m.Boolean(1))
+            self.assertEqual(m.DoNothing(), m.DoNothing())
+            self.assertFalse(hasattr(m.Number(1), '__dict__'))
+        self.assertNotEqual(big_step.Number(1), small_step.Number(1))
+
+    def test_deep_tree(self):
+        m = big_step
+        first = second = m.Number(0)
+        for _ in range(10000):
+            first = m.Add(first, m.Number(1))
+            second = m.Add(second, m.Number(1))
+        self.assertEqual(hash(first), hash(second))
+        self.assertEqual(first, second)
+
+    def test_interner(self):
+        m = small_step
+        interner = Interner()
+        tree = interner.intern(m.Add(m.Multiply(m.Variable('x'), m.Number(2)), m.Multiply(m.Variable('x'), m.Number(2))))
+        self.assertIs(tree.left, tree.right)
+        self.assertEqual(len(interner), 4)
+        self.assertEqual(repr(tree), '<<<x> * <2>> + <<x> * <2>>>')
+
+        statement = interner.intern(m.Assign('y', m.Multiply(m.Variable('x'), m.Number(2))))
+        self.assertIs(statement.expression, tree.left)
+        self.assertIs(interner.make(m.Add, tree.left, tree.right), tree)
+        self.assertIs(interner.make(m.Number, True), interner.make(m.Number, True))
+        self.assertIsNot(interner.make(m.Number, True), interner.make(m.Number, 1))
@@ -0,0 +1,67 @@
+from unittest import TestCase
+
+from model import big_step, small_step
+from model.node import walk
+from model.optimizer import optimize
+
+
+class TestOptimizer(TestCase):
+
+    def test_fold_expression(self):
+        for module in (big_step, small_step):
+            self.assertEqual(repr(optimize(module.Add(module.Number(2), module.Number(3)))), '<5>')
+            self.assertEqual(repr(optimize(module.Multiply(module.Add(module.Variable('x'), module.Variable('y')),
+                                                           module.Number(1)))), '<<x> + <y>>')
+            self.assertEqual(repr(optimize(module.Add(module.Number(0), module.Multiply(module.Number(2),
+                                                                                     module.Variable('x'))))),
+                             '<<2> * <x>>')
+            self.assertEqual(repr(optimize(module.LessThan(module.Add(module.Number(1), module.Number(1)),
+                                                           module.Number(3)))), '<True>')
+            self.assertIsInstance(optimize(module.Number(1)), module.Number)
+
+    def test_fold_statement(self):
+        m = big_step
+        statement = m.Sequence(
+            m.Assign('x', m.Multiply(m.Add(m.Number(2), m.Number(3)), m.Variable('y'))),
+            m.IF(
+                m.LessThan(m.Number(5), m.Number(3)),
+                m.While(m.LessThan(m.Variable('x'), m.Number(10)), m.Assign('x', m.Add(m.Variable('x'), m.Number(1)))),
+                m.Sequence(m.While(m.Boolean(False), m.Assign('x', m.Number(0))), m.Assign('z', m.Variable('x')))
+            )
+        )
+        optimized = optimize(statement)
+        self.assertEqual(repr(optimized), '<<x = <<5> * <y>>>; <z = <x>>>')
+        env = {'y': m.Number(2)}
+        self.assertEqual(repr(optimized.evaluate(env)), repr(statement.evaluate(env)))
+
+        s = small_step
+        statement = s.IF(s.Boolean(True), s.Sequence(s.DoNothing(), s.Assign('x', s.Number(1))), s.DoNothing())
+        optimized = optimize(statement)
+        self.assertIsInstance(optimized, s.Assign)
+        self.assertEqual(repr(optimized), '<x = <1>>')
+
+    def test_fold_boolean(self):
+        # x + 0 and x * 1 are numbers, so the identities only drop the number next to a numeric x
+        m = big_step
+        for node in (m.Multiply(m.Number(1), m.Boolean(False)), m.Add(m.LessThan(m.Number(1), m.Variable('x')),
+                                                                     m.Number(0))):
+            self.assertIsInstance(optimize(node), type(node))
+        self.assertEqual(repr(optimize(m.Multiply(m.Number(1), m.Boolean(False))).evaluate({})), '<0>')
+
+        statement = m.IF(m.Multiply(m.Variable('b'), m.Number(1)), m.Assign('r', m.Number(1)), m.Assign('r', m.Number(2)))
+        optimized = optimize(statement)
+        self.assertEqual(optimized, statement)
+        env = {'b': m.Boolean(True)}
+        self.assertEqual(repr(optimized.evaluate(env)), repr(statement.evaluate(env)))
+
+    def test_deep(self):
+        # a long program nests its statements deeper than the recursion limit
+        m = big_step
+        statement = m.Assign('x', m.Number(0))
+        for n in range(5000):
+            statement = m.Sequence(statement, m.Assign('x', m.Add(m.Variable('x'), m.Add(m.Number(n), m.Number(1)))))
+            statement = m.Sequence(statement, m.DoNothing())
+        optimized = optimize(statement)
+        self.assertEqual(len(walk(optimized)), 2 + 5000 * 5)
+        self.assertIsInstance(optimized.second, m.Assign)
+        self.assertEqual(repr(optimized.second.expression.right), '<5000>')
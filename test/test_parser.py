@@ -0,0 +1,112 @@
+import unittest
+
+from model import big_step, small_step
+from model.parser import parse, parse_expression, lexer, IncrementalParser, unparse
+
+
+class ParserTestCase(unittest.TestCase):
+
+    def test_tokenize(self):
+        tokens = list(lexer().tokenize('while (x1 < 10) { x1 = x1 * 3 }; do-nothing; iffy = true'))
+        self.assertEqual([token.kind for token in tokens],
+                         ['while', '(', 'name', '<', 'number', ')', '{', 'name', '=', 'name', '*', 'number', '}', ';',
+                          'do-nothing', ';', 'name', '=', 'true'])
+        self.assertEqual((tokens[-3].text, tokens[-3].start, tokens[-3].end), ('iffy', 45, 49))
+        with self.assertRaises(SyntaxError):
+            list(lexer().tokenize('x = 1 - 2'))
+
+    def test_parse(self):
+        self.assertEqual(parse_expression('1 + 2 * (3 + x) < y'),
+                         big_step.LessThan(
+                             big_step.Add(
+                                 big_step.Number(1),
+                                 big_step.Multiply(big_step.Number(2),
+                                                   big_step.Add(big_step.Number(3), big_step.Variable('x')))
+                             ),
+                             big_step.Variable('y')
+                         ))
+
+        statement = parse('x = 1; while (x < 5) { x = x * 3 }; if (false) { y = 1 } else { y = 2; }', small_step)
+        self.assertEqual(repr(statement),
+                         '<<x = <1>>; <<while <<x> < <5>>: <x = <<x> * <3>>>>; '
+                         '<if <False>: <y = <1>> else: <y = <2>>>>')
+        self.assertIsInstance(statement, small_step.Sequence)
+        self.assertEqual(repr(parse('x = 1; while (x < 5) { x = x * 3 }').evaluate({})), "{'x': <9>}")
+        self.assertEqual(parse(''), big_step.DoNothing())
+
+        for text in ('x = ', 'x = 1 y = 2', 'while (x) { x = 1', 'x = 1;;', 'if x < 1 { }'):
+            with self.assertRaises(SyntaxError):
+                parse(text)
+
+    def test_incremental(self):
+        parser = IncrementalParser()
+        tree = parser.parse('a = 1; b = 2; while (a < 3) { a = a + 1 }')
+        first, loop = tree.first, tree.second.second
+
+        # only the edited statement is parsed again, the others are the same objects as before
+        tree = parser.parse('a = 1; b = 25; while (a < 3) { a = a + 1 }')
+        self.assertEqual(tree, parse('a = 1; b = 25; while (a < 3) { a = a + 1 }'))
+        self.assertEqual(parser.reused, 2)
+        self.assertIs(tree.first, first)
+        self.assertIs(tree.second.second, loop)
+
+        tree = parser.parse('a = 1; b = 25; c = 3; while (a < 3) { a = a + 1 }')
+        self.assertEqual(tree, parse('a = 1; b = 25; c = 3; while (a < 3) { a = a + 1 }'))
+        self.assertEqual(parser.reused, 3)
+
+        # growing the last token of a statement parses it again
+        tree = parser.parse('a = 12; b = 25; c = 3; while (a < 3) { a = a + 1 }')
+        self.assertEqual(tree.first, big_step.Assign('a', big_step.Number(12)))
+
+        # a broken separator falls back to the full parse and its error
+        with self.assertRaises(SyntaxError):
+            parser.parse('a = 12; b = 25 c = 3; while (a < 3) { a = a + 1 }')
+        self.assertEqual(parser.parse('a = 12; c = 3'), parse('a = 12; c = 3'))
+
+    def test_incremental_blocks(self):
+        parser = IncrementalParser()
+        text = 'a = 1; while (a < 3) { b = 1; if (b < 2) { c = 1; d = 2 } else { e = 3 } }; f = 4'
+        tree = parser.parse(text)
+        loop = tree.second.first
+        first, branch = loop.body.first, loop.body.second
+
+        # an edit inside a block only parses the statements of that block again
+        text = text.replace('c = 1', 'c = 10')
+        tree = parser.parse(text)
+        self.assertEqual(tree, parse(text))
+        # a and f, then b in the loop, then d in the consequence
+        self.assertEqual(parser.reused, 4)
+        self.assertIs(tree.first, parser.statements[0][0])
+        self.assertIs(tree.second.first.body.first, first)
+        self.assertIsNot(tree.second.first.body.second, branch)
+        self.assertIs(tree.second.first.body.second.alternative, branch.alternative)
+
+        # the blocks after the edit are shifted, so they can be edited next
+        text = text.replace('e = 3', 'e = 3; g = 5')
+        self.assertEqual(parser.parse(text), parse(text))
+        self.assertEqual(parser.reused, 4)
+        text = text.replace('{ b = 1;', '{ ')
+        self.assertEqual(parser.parse(text), parse(text))
+        self.assertEqual(parser.reused, 3)
+        text = text.replace('f = 4', 'f = 4; h = 6')
+        self.assertEqual(parser.parse(text), parse(text))
+        self.assertEqual(parser.reused, 3)
+
+        # a brace typed inside a block can't be parsed there, the full parse decides
+        with self.assertRaises(SyntaxError):
+            parser.parse(text.replace('g = 5', 'g = 5 }'))
+
+    def test_unparse(self):
+        for text in ('x = 1 + 2 * (3 + y) < (1 < 2)', 'x = 1 + 2 + (3 + 4) * 5',
+                     'if (x < 3) { y = 1 } else { do-nothing }; while (true) { x = x + 1; y = x < 1 }'):
+            self.assertEqual(unparse(parse(text)), text)
+        self.assertEqual(unparse(big_step.Assign('x', big_step.Multiply(
+            big_step.Number(2), big_step.Add(big_step.Number(3), big_step.Number(4))))), 'x = 2 * (3 + 4)')
+        with self.assertRaises(ValueError):
+            unparse(big_step.Number(-1))
+
+        # statements can't be bracketed, a left nested sequence comes back nested to the right
+        a, b, c = (big_step.Assign(name, big_step.Number(1)) for name in 'abc')
+        self.assertEqual(unparse(big_step.Sequence(big_step.Sequence(a, b), c)), 'a = 1; b = 1; c = 1')
+        self.assertEqual(parse(unparse(big_step.Sequence(big_step.Sequence(a, b), c))),
+                         big_step.Sequence(a, big_step.Sequence(b, c)))
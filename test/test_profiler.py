@@ -0,0 +1,64 @@
+import os
+import tempfile
+import unittest
+
+from model import big_step, small_step
+from model.profiler import Profiler
+
+
+class ProfilerTestCase(unittest.TestCase):
+
+    def loop(self, module):
+        return module.Sequence(
+            module.Assign('x', module.Number(1)),
+            module.While(
+                module.LessThan(module.Variable('x'), module.Number(5)),
+                module.Assign('x', module.Add(module.Variable('x'), module.Number(1)))
+            )
+        )
+
+    def test_big_step(self):
+        execute = big_step.While.__dict__['execute']
+        with Profiler() as profiler:
+            self.assertIsNot(big_step.While.__dict__['execute'], execute)
+            env = self.loop(big_step).evaluate({})
+        # the original methods are back once the profiler is off
+        self.assertIs(big_step.While.__dict__['execute'], execute)
+        self.assertEqual(repr(env), "{'x': <5>}")
+
+        self.assertEqual(profiler.stats['While.execute'].calls, 5)
+        self.assertEqual(profiler.stats['LessThan.evaluate'].calls, 5)
+        self.assertEqual(profiler.stats['Assign.execute'].calls, 5)
+        self.assertEqual(profiler.stats['Add.evaluate'].calls, 4)
+        self.assertEqual(profiler.env_updates, 5)
+        self.assertEqual(profiler.env_update_size, 0 + 1 + 1 + 1 + 1)
+        stats = profiler.stats['While.execute']
+        self.assertLessEqual(stats.own, stats.total)
+        self.assertIn('While.execute', profiler.report())
+
+    def test_small_step(self):
+        with Profiler(modules=(small_step,)) as profiler:
+            machine = small_step.StatementMachine(self.loop(small_step), {})
+            while machine.zipper.reducible:
+                machine.step()
+        self.assertEqual(repr(machine.env), "{'x': <5>}")
+        self.assertEqual(profiler.stats['While.contract'].calls, 5)
+        self.assertEqual(profiler.stats['StatementMachine.step'].calls, profiler.stats['Zipper.step'].calls)
+        self.assertEqual(profiler.stats['Add.evaluate'].calls, 0)
+
+        with self.assertRaises(RuntimeError):
+            with Profiler():
+                Profiler().enable()
+
+    def test_collapsed(self):
+        with Profiler() as profiler:
+            self.loop(big_step).evaluate({})
+        lines = profiler.collapsed().splitlines()
+        stacks = [line.rsplit(' ', 1)[0] for line in lines]
+        self.assertTrue(all(stack.startswith('Statement.evaluate') for stack in stacks))
+        self.assertTrue(all(int(line.rsplit(' ', 1)[1]) > 0 for line in lines))
+
+        path = os.path.join(tempfile.mkdtemp(), 'profile.folded')
+        profiler.write_collapsed(path)
+        with open(path) as file:
+            self.assertEqual(file.read().splitlines(), lines)
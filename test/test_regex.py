@@ -0,0 +1,54 @@
+from unittest import TestCase
+
+from model import regex
+from model.regex import Empty, Literal, Concatenate, Choose, Repeat, parse
+
+
+class TestRegex(TestCase):
+
+    def test_pattern(self):
+        pattern = Repeat(Choose(Concatenate(Literal('a'), Literal('b')), Literal('a')))
+        self.assertEqual(repr(pattern), '/(ab|a)*/')
+        self.assertTrue(pattern.matches(''))
+        self.assertTrue(pattern.matches('a'))
+        self.assertTrue(pattern.matches('abaab'))
+        self.assertFalse(pattern.matches('abba'))
+        self.assertTrue(Empty().matches(''))
+        self.assertFalse(Empty().matches('a'))
+
+    def test_parse(self):
+        self.assertEqual(repr(parse('(a(|b))*')), '/(a(|b))*/')
+        self.assertEqual(repr(parse('a+b?|[a-c]\\*')), '/a+b?|[abc]\\*/')
+        for text in ('(a', 'a)', '*', '[]', '[c-a]', 'a\\'):
+            with self.assertRaises(SyntaxError):
+                parse(text)
+
+    def test_matches(self):
+        cases = [
+            ('ab*c', ['ac', 'abbbc'], ['', 'abcb']),
+            ('a(b|c)+', ['ab', 'acbcb'], ['a', 'ad']),
+            ('colou?r', ['color', 'colour'], ['colouur']),
+            ('[a-z_][a-z0-9_]*', ['x', 'snake_case2'], ['2x', '']),
+            ('\\(\\)', ['()'], ['']),
+            ('', [''], ['a']),
+        ]
+        for text, accepted, rejected in cases:
+            for factory in (regex.compile(text), regex.compile(text, deterministic=True)):
+                for string in accepted:
+                    self.assertTrue(factory.accept(string), (text, string))
+                for string in rejected:
+                    self.assertFalse(factory.accept(string), (text, string))
+            self.assertTrue(regex.matches(text, accepted[0]))
+
+        # compiled patterns are cached by their text
+        self.assertIs(regex.compile('ab*c'), regex.compile('ab*c'))
+
+    def test_long_pattern(self):
+        # a long pattern nests its concatenations deeper than the recursion limit
+        text = 'ab' * 2500 + '(c|d)*'
+        factory = regex.compile(text)
+        # a rule per literal, a free move per concatenation, 4 for the choice and 3 for the repetition
+        self.assertEqual(len(factory.rulebook.rules), 5000 + 5000 + 4 + 3)
+        self.assertTrue(factory.accept('ab' * 2500 + 'cdc'))
+        self.assertFalse(factory.accept('ab' * 2499 + 'a'))
+        self.assertTrue(regex.matches(text, 'ab' * 2500))
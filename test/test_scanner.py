@@ -0,0 +1,71 @@
+from unittest import TestCase
+
+from model.scanner import Scanner
+from model.state_machine import FARule, DFARuleBook, DFAFactory, NFARuleBook, NFAFactory
+
+
+class TestScanner(TestCase):
+
+    def test_scan(self):
+        # "ab"
+        ab = DFAFactory(1, [3], DFARuleBook([FARule(1, 'a', 2), FARule(2, 'b', 3)]))
+        # "b" followed by one or more "a"
+        ba = NFAFactory(1, [3], NFARuleBook([FARule(1, 'b', 2), FARule(2, 'a', 3), FARule(3, 'a', 3)]))
+        scanner = Scanner({'ab': ab, 'ba+': ba})
+        self.assertEqual(list(scanner.scan('xabaab')), [
+            ('ab', 1, 3),
+            ('ba+', 2, 4),
+            ('ba+', 2, 5),
+            ('ab', 4, 6),
+        ])
+        self.assertEqual(list(scanner.scan('')), [])
+
+        # patterns without names are numbered, and the text can be any iterable of characters
+        scanner = Scanner([ab, ab])
+        self.assertEqual(list(scanner.scan(iter('abab'))), [(0, 0, 2), (1, 0, 2), (0, 2, 4), (1, 2, 4)])
+
+    def test_scan_free_moves(self):
+        # "a" optionally followed by "b"
+        ab = NFAFactory(1, [2, 3], NFARuleBook([FARule(1, 'a', 2), FARule(2, None, 4), FARule(4, 'b', 3)]))
+        scanner = Scanner([ab])
+        self.assertEqual(list(scanner.scan('abca')), [(0, 0, 1), (0, 0, 2), (0, 3, 4)])
+
+    def test_scan_many_patterns(self):
+        # every pattern is a word, the merged automaton still reads each character once
+        words = ['ab', 'abc', 'bc', 'c', 'ca', 'cab', 'b', 'bca']
+        factories = {word: DFAFactory(0, [len(word)], DFARuleBook([FARule(index, character, index + 1)
+                                                                  for index, character in enumerate(word)]))
+                     for word in words}
+        scanner = Scanner(factories)
+        text = 'abcabca'
+        expected = []
+        for end in range(1, len(text) + 1):
+            matches = sorted((end - len(word), words.index(word), word) for word in words
+                             if text[max(end - len(word), 0):end] == word)
+            expected.extend((word, start, end) for start, _, word in matches)
+        self.assertEqual(list(scanner.scan(text)), expected)
+        # scanning again runs on the cached subsets
+        self.assertEqual(list(scanner.scan(text)), expected)
+
+    def test_scan_lazy(self):
+        # a lazily determinized automaton has no rules to merge
+        ab = NFAFactory(1, [3], NFARuleBook([FARule(1, 'a', 2), FARule(2, 'b', 3)]))
+        with self.assertRaises(TypeError):
+            Scanner([ab.to_dfa(lazy=True)])
+        self.assertEqual(list(Scanner([ab.to_dfa()]).scan('abab')), [(0, 0, 2), (0, 2, 4)])
+
+    def test_scan_stream(self):
+        # "a" repeated, every end position has the same leftmost start
+        a = NFAFactory(1, [2], NFARuleBook([FARule(1, 'a', 2), FARule(2, 'a', 2)]))
+        read = []
+
+        def text():
+            for character in 'aaabaa':
+                read.append(character)
+                yield character
+
+        matches = Scanner([a]).scan(text())
+        self.assertEqual(next(matches), (0, 0, 1))
+        # the text is read as the matches are asked for
+        self.assertEqual(read, ['a'])
+        self.assertEqual(list(matches), [(0, 0, 2), (0, 0, 3), (0, 4, 5), (0, 4, 6)])
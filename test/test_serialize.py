@@ -0,0 +1,99 @@
+import os
+import pickle
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from model import big_step, small_step, serialize
+from model.node import Interner
+from model.parser import parse
+from model.regex import parse as parse_pattern
+from model.state_machine import FARule, DFARuleBook, DFAFactory, CompiledDFARuleBook
+
+
+class TestSerialize(TestCase):
+
+    def test_node(self):
+        program = parse('x = 1 + 2 * (3 + y) < 4; while (x < 10) { x = x + 1; b = true }; '
+                        'if (x < 3) { do-nothing } else { z = 12345678901 }')
+        data = serialize.dumps(program)
+        self.assertLess(len(data), len(pickle.dumps(program)))
+        self.assertEqual(serialize.loads(data), program)
+
+        # the same table builds the nodes of another module
+        loaded = serialize.loads(data, small_step)
+        self.assertIsInstance(loaded, small_step.Sequence)
+        self.assertEqual(repr(loaded), repr(program))
+
+        # shared subtrees are written once and stay shared
+        interner = Interner()
+        program = interner.intern(parse('x = 1 + 2; y = 1 + 2'))
+        loaded = serialize.loads(serialize.dumps(program))
+        self.assertIs(loaded.first.expression, loaded.second.expression)
+
+        with self.assertRaises(ValueError):
+            serialize.loads(b'not a serialized program')
+
+    def test_constants(self):
+        # numbers beyond int64 and floats are tagged constants
+        for value in (-1, 1 << 62, 1 << 70, -(1 << 80), 1.5, -0.25):
+            program = big_step.Assign('x', big_step.Add(big_step.Number(value), big_step.Number(1)))
+            loaded = serialize.loads(serialize.dumps(program))
+            self.assertEqual(loaded, program)
+            self.assertIs(type(loaded.expression.left.value), type(value))
+        with self.assertRaises(ValueError):
+            serialize.dumps(big_step.Number('1'))
+
+        # a file can only ask for the node modules of the model
+        data = serialize.dumps(big_step.Number(1))
+        forged = data.replace(b'model.big_step', b'model.xig_step')
+        with self.assertRaises(ValueError):
+            serialize.loads(forged)
+        self.assertEqual(serialize.loads(forged, small_step), small_step.Number(1))
+
+    def test_dfa(self):
+        # strings with an even number of a
+        factory = DFAFactory(1, [1], DFARuleBook([
+            FARule(1, 'a', 2), FARule(1, 'b', 1), FARule(2, 'a', 1), FARule(2, 'b', 2)
+        ]))
+        loaded = serialize.loads(serialize.dumps(factory))
+        self.assertIsInstance(loaded.rulebook, CompiledDFARuleBook)
+        for string in ('', 'a', 'aa', 'abab', 'bab', 'c'):
+            self.assertEqual(loaded.accept(string), factory.accept(string))
+        self.assertEqual(loaded.accept_many(['aa', 'a']), [True, False])
+
+        # the rules are built from the table once they are needed
+        self.assertEqual(len(loaded.rulebook.rules), 4)
+        self.assertEqual(loaded.rulebook.rule_for(loaded.start_state, 'a').next_state, 1)
+
+        # a start state without any rule
+        loaded = serialize.loads(serialize.dumps(DFAFactory(3, [3], DFARuleBook([FARule(1, 'a', 2)]))))
+        self.assertTrue(loaded.accept(''))
+        self.assertFalse(loaded.accept('a'))
+
+    def test_nfa(self):
+        factory = parse_pattern('(a|b)*a(a|b)').to_nfa_design()
+        loaded = serialize.loads(serialize.dumps(factory))
+        self.assertEqual(len(loaded.rulebook.rules), len(factory.rulebook.rules))
+        for string in ('', 'a', 'ab', 'bab', 'abb', 'aab'):
+            self.assertEqual(bool(loaded.accept(string)), bool(factory.accept(string)))
+
+    def test_file(self):
+        factory = parse_pattern('(a|b)*abb').to_nfa_design().to_dfa()
+        with TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'dfa.bin')
+            serialize.dump(factory, path)
+            loaded = serialize.load(path)
+            # the table is read straight from the mapped file
+            self.assertIsInstance(loaded.rulebook.table, memoryview)
+            self.assertTrue(loaded.accept('babb'))
+            self.assertFalse(loaded.accept('abba'))
+
+            path = os.path.join(directory, 'program.bin')
+            program = big_step.Assign('x', big_step.Add(big_step.Variable('x'), big_step.Number(1)))
+            serialize.dump(program, path)
+            self.assertEqual(serialize.load(path), program)
+
+            # programs and nfas are read, not mapped, so their file is left alone
+            path = os.path.join(directory, 'nfa.bin')
+            serialize.dump(parse_pattern('a+b').to_nfa_design(), path)
+            self.assertTrue(serialize.load(path).accept('aab'))
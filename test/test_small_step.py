@@ -3,7 +3,7 @@ from io import StringIO
 from unittest.mock import patch
 
 from model.small_step import Number, Add, Multiply, ExpressionMachine, StatementMachine, LessThan, Variable, Assign, \
-    IF, Boolean, Sequence, While
+    IF, Boolean, Sequence, While, Trace, DoNothing
 
 
 class ModelTestCase(unittest.TestCase):
@@ -158,3 +158,100 @@ class ModelTestCase(unittest.TestCase):
                          "<do-nothing>\n"
                          "{'x': <3>}\n"
                          )
+
+    def test_run_to_completion(self):
+        machine = StatementMachine(
+            Sequence(
+                Assign('x', Add(Number(1), Number(2))),
+                While(
+                    LessThan(Variable('x'), Number(100)),
+                    Assign('x', Multiply(Variable('x'), Number(3)))
+                )
+            ),
+            {}
+        )
+        statement, env, steps = machine.run_to_completion()
+        self.assertFalse(statement.reducible)
+        self.assertEqual(repr(env), "{'x': <243>}")
+        # the assignment, two steps for each of the four iterations and the last check
+        self.assertEqual(steps, 10)
+        self.assertIs(machine.env, env)
+
+        machine = StatementMachine(
+            While(Boolean(True), Assign('x', Number(1))),
+            {}
+        )
+        statement, env, steps = machine.run_to_completion(max_steps=5)
+        self.assertTrue(statement.reducible)
+        self.assertEqual(steps, 5)
+
+    def test_trace(self):
+        steps = list(ExpressionMachine(
+            Add(Variable('x'), Variable('y')),
+            {'x': Number(3), 'y': Number(4)}
+        ).trace())
+        self.assertEqual([step.render() for step in steps], ['<<x> + <y>>', '<<3> + <y>>', '<<3> + <4>>', '<7>'])
+
+        machine = StatementMachine(
+            While(
+                LessThan(Variable('x'), Number(3)),
+                Assign('x', Multiply(Variable('x'), Number(3)))
+            ),
+            {'x': Number(1)}
+        )
+        trace = Trace(2).record(machine.trace())
+        self.assertEqual([step.number for step in trace.steps], [11, 12])
+        self.assertEqual(trace.dump(),
+                         "<if <False>: <<x = <<x> * <3>>>; <while <<x> < <3>>: <x = <<x> * <3>>>>> else: <do-nothing>\n"
+                         "{'x': <3>}\n"
+                         "<do-nothing>\n"
+                         "{'x': <3>}")
+
+        # the steps before a failure are kept
+        trace = Trace(3)
+        with self.assertRaises(KeyError):
+            trace.record(StatementMachine(
+                Sequence(Assign('x', Number(1)), Assign('y', Variable('z'))),
+                {}
+            ).trace())
+        self.assertEqual(trace.dump().splitlines()[-2:], ['<y = <z>>', "{'x': <1>}"])
+
+    def test_zipper(self):
+        # a left deep sum, every step only rebuilds the spine above the redex once
+        expression = Number(0)
+        for number in range(1, 301):
+            expression = Add(expression, Number(number))
+        machine = ExpressionMachine(expression)
+        steps = list(machine.trace())
+        self.assertEqual(len(steps), 301)
+        self.assertEqual(repr(machine.expression), '<45150>')
+
+        # the zipper gives the same steps as reduce
+        statement = Sequence(
+            Assign('x', Add(Number(1), Number(2))),
+            IF(LessThan(Variable('x'), Number(5)), Assign('y', Variable('x')), DoNothing())
+        )
+        env = {}
+        expected = []
+        while statement.reducible:
+            statement, env = statement.reduce(env)
+            expected.append((repr(statement), repr(env)))
+        machine = StatementMachine(Sequence(
+            Assign('x', Add(Number(1), Number(2))),
+            IF(LessThan(Variable('x'), Number(5)), Assign('y', Variable('x')), DoNothing())
+        ), {})
+        actual = []
+        while machine.zipper.reducible:
+            machine.step()
+            actual.append((repr(machine.statement), repr(machine.env)))
+        self.assertEqual(actual, expected)
+
+        # a trace step keeps the focus and the shared path, the whole tree is only built when it is rendered
+        expression = Number(0)
+        for number in range(2000):
+            expression = Add(Number(number), expression)
+        steps = list(ExpressionMachine(expression).trace())
+        self.assertEqual(len(steps), 2001)
+        self.assertIs(steps[1].path[2], steps[2].path)
+        self.assertEqual(steps[-1].render(), '<1999000>')
+        self.assertEqual(steps[-2].render(), '<<1999> + <1997001>>')
@@ -1,4 +1,8 @@
-from model.state_machine import DFARuleBook, FARule, DFA, DFAFactory, NFARuleBook, NFA, NFAFactory
+from model.state_machine import DFARuleBook, FARule, DFA, DFAFactory, NFARuleBook, NFA, NFAFactory, \
+    BitsetNFARuleBook, BitsetNFA
+import os
+from io import BytesIO, StringIO
+from tempfile import TemporaryDirectory
 from unittest import TestCase
 
 
@@ -91,3 +95,355 @@ class TestStateMachine(TestCase):
         self.assertTrue(nfa_factory.accept('bab'))
         self.assertTrue(nfa_factory.accept('bbbbb'))
         self.assertFalse(nfa_factory.accept('bbabb'))
+
+    def test_compiled_dfa(self):
+        rulebook = DFARuleBook(
+            [
+                FARule(1, 'a', 2),
+                FARule(1, 'b', 1),
+
+                FARule(2, 'a', 2),
+                FARule(2, 'b', 3),
+
+                FARule(3, 'a', 3),
+                FARule(3, 'b', 3),
+            ]
+        ).compile()
+        self.assertEqual(rulebook.next_state(1, 'a'), 2)
+        self.assertEqual(rulebook.next_state(2, 'b'), 3)
+        self.assertIsNone(rulebook.next_state(1, 'c'))
+
+        dfa = DFA(1, [3], rulebook)
+        dfa.read_string('baaab')
+        self.assertTrue(dfa.accepting())
+
+        # a missing rule leads to a dead state which never accepts
+        dfa = DFA(1, [3], rulebook)
+        dfa.read_string('bacbb')
+        self.assertIsNone(dfa.current_state)
+        self.assertFalse(dfa.accepting())
+
+        dfa_factory = DFAFactory(1, [3], DFARuleBook(rulebook.rules)).compile()
+        self.assertFalse(dfa_factory.accept('a'))
+        self.assertFalse(dfa_factory.accept('baa'))
+        self.assertTrue(dfa_factory.accept('baba'))
+        self.assertFalse(dfa_factory.accept('babac'))
+
+        # a start state without any rule still accepts the empty string
+        empty = DFAFactory(1, [1], DFARuleBook([])).compile()
+        self.assertTrue(empty.accept(''))
+        self.assertFalse(empty.accept('a'))
+        self.assertEqual(empty.accept_many(['', 'a']), [True, False])
+        self.assertTrue(empty.accept_stream(BytesIO(b'')))
+        minimized, _ = DFAFactory(1, [1], DFARuleBook([FARule(1, 'a', 2)])).compile().minimize()
+        self.assertTrue(minimized.accept(''))
+        self.assertFalse(minimized.accept('a'))
+
+        # changing the compiled rulebook leaves the original one alone
+        original = DFARuleBook([FARule(1, 'a', 2)])
+        original.compile().add_rule(FARule(2, 'b', 1))
+        self.assertEqual(len(original.rules), 1)
+        self.assertIsNone(original.rule_for(2, 'b'))
+
+    def test_nfa_to_dfa(self):
+        rulebook = NFARuleBook(
+            [
+                FARule(1, 'a', 1),
+                FARule(1, 'b', 1),
+                FARule(1, 'b', 2),
+
+                FARule(2, 'a', 3),
+                FARule(2, 'b', 3),
+
+                FARule(3, 'a', 4),
+                FARule(3, 'b', 4),
+            ]
+        )
+        nfa_factory = NFAFactory(1, [4], rulebook)
+        for dfa_factory in (nfa_factory.to_dfa(), nfa_factory.to_dfa().compile(),
+                            nfa_factory.to_dfa(lazy=True, cache_size=2)):
+            for string in ('bab', 'bbbbb', 'bbabb', 'a', 'bba', ''):
+                self.assertEqual(bool(dfa_factory.accept(string)), bool(nfa_factory.accept(string)))
+
+        # the eager construction only keeps reachable subsets
+        dfa_factory = nfa_factory.to_dfa()
+        self.assertEqual(dfa_factory.start_state, frozenset({1}))
+        self.assertEqual(len(dfa_factory.rulebook.rules), 8 * 2)
+        self.assertEqual(len(dfa_factory.accept_states), 4)
+
+    def test_rulebook_index(self):
+        rule = FARule(2, 'b', 1)
+        rulebook = DFARuleBook([FARule(1, 'a', 2), FARule(2, 'b', 3)])
+        rulebook.add_rule(rule)
+        self.assertEqual(rulebook.next_state(2, 'b'), 3)
+        rulebook.remove_rule(rulebook.rule_for(2, 'b'))
+        self.assertEqual(rulebook.next_state(2, 'b'), 1)
+        rulebook.remove_rule(rule)
+        self.assertIsNone(rulebook.next_state(2, 'b'))
+
+        rulebook = DFARuleBook([FARule(1, 'a', 2)]).compile()
+        rulebook.add_rule(FARule(2, 'c', 1))
+        self.assertEqual(rulebook.follow_string(1, 'acac'), 1)
+
+        rule = FARule(1, 'b', 3)
+        rulebook = NFARuleBook([FARule(1, 'b', 1), FARule(1, 'b', 2)])
+        rulebook.add_rule(rule)
+        self.assertEqual(rulebook.next_states([1], 'b'), {1, 2, 3})
+        rulebook.remove_rule(rule)
+        self.assertEqual(rulebook.next_states([1], 'b'), {1, 2})
+        self.assertEqual(rulebook.next_states([2], 'b'), set())
+
+    def test_bitset_nfa(self):
+        rulebook = BitsetNFARuleBook(
+            [
+                FARule(1, 'a', 1),
+                FARule(1, 'b', 1),
+                FARule(1, 'b', 2),
+
+                FARule(2, 'a', 3),
+                FARule(2, 'b', 3),
+
+                FARule(3, 'a', 4),
+                FARule(3, 'b', 4),
+            ]
+        )
+        self.assertEqual(rulebook.next_states([1], 'b'), {1, 2})
+        self.assertEqual(rulebook.states_for(rulebook.next_mask(rulebook.mask_for([1, 2]), 'a')), {1, 3})
+        self.assertEqual(rulebook.states_for(rulebook.next_mask(rulebook.mask_for([1, 3]), 'b')), {1, 2, 4})
+
+        nfa = BitsetNFA({1}, {4}, rulebook)
+        self.assertFalse(nfa.accepting())
+
+        nfa.read_character('b')
+        self.assertFalse(nfa.accepting())
+
+        nfa.read_character('a')
+        self.assertFalse(nfa.accepting())
+
+        nfa.read_character('b')
+        self.assertTrue(nfa.accepting())
+        self.assertEqual(nfa.current_states, {1, 2, 4})
+
+        nfa = BitsetNFA({1}, {4}, rulebook)
+        nfa.read_string('bbbbb')
+        self.assertTrue(nfa.accepting())
+
+        nfa_factory = NFAFactory(1, [4], NFARuleBook(rulebook.rules)).to_bitset()
+        self.assertTrue(nfa_factory.accept('bab'))
+        self.assertTrue(nfa_factory.accept('bbbbb'))
+        self.assertFalse(nfa_factory.accept('bbabb'))
+
+        # a chain longer than one byte of states
+        rules = [FARule(state, 'a', state + 1) for state in range(20)]
+        nfa_factory = NFAFactory(0, [20], NFARuleBook(rules)).to_bitset()
+        self.assertTrue(nfa_factory.accept('a' * 20))
+        self.assertFalse(nfa_factory.accept('a' * 19))
+        self.assertFalse(nfa_factory.accept('a' * 21))
+
+        # changing the bitset rulebook leaves the original one alone
+        original = NFAFactory(0, [1], NFARuleBook([FARule(0, 'a', 1)]))
+        original.to_bitset().rulebook.add_rule(FARule(1, 'b', 0))
+        self.assertEqual(len(original.rulebook.rules), 1)
+        self.assertFalse(original.accept('ab'))
+
+    def test_accept_many(self):
+        dfa_factory = DFAFactory(1, [3], DFARuleBook(
+            [
+                FARule(1, 'a', 2),
+                FARule(1, 'b', 1),
+
+                FARule(2, 'a', 2),
+                FARule(2, 'b', 3),
+
+                FARule(3, 'a', 3),
+                FARule(3, 'b', 3),
+            ]
+        ))
+        strings = ['a', 'baa', 'baba', 'bac', '']
+        self.assertEqual(dfa_factory.accept_many(strings), [False, False, True, False, False])
+
+        nfa_factory = NFAFactory(1, [4], NFARuleBook(
+            [
+                FARule(1, 'a', 1),
+                FARule(1, 'b', 1),
+                FARule(1, 'b', 2),
+
+                FARule(2, 'a', 3),
+                FARule(2, 'b', 3),
+
+                FARule(3, 'a', 4),
+                FARule(3, 'b', 4),
+            ]
+        ))
+        strings = ['bab', 'bbbbb', 'bbabb', 'b']
+        self.assertEqual(nfa_factory.accept_many(iter(strings)), [True, True, False, False])
+        self.assertEqual(nfa_factory.to_bitset().accept_many(strings), [True, True, False, False])
+
+    def test_stream(self):
+        dfa_factory = DFAFactory(1, [3], DFARuleBook(
+            [
+                FARule(1, 'a', 2),
+                FARule(1, 'b', 1),
+
+                FARule(2, 'a', 2),
+                FARule(2, 'b', 3),
+
+                FARule(3, 'a', 3),
+                FARule(3, 'b', 3),
+            ]
+        ))
+        nfa_factory = NFAFactory(1, [4], NFARuleBook(
+            [
+                FARule(1, 'a', 1),
+                FARule(1, 'b', 1),
+                FARule(1, 'b', 2),
+
+                FARule(2, 'a', 3),
+                FARule(2, 'b', 3),
+
+                FARule(3, 'a', 4),
+                FARule(3, 'b', 4),
+            ]
+        ))
+        # the chunk size splits the input in the middle of a match
+        for factory in (dfa_factory, dfa_factory.compile()):
+            self.assertTrue(factory.accept_stream(BytesIO(b'bbbbaab'), chunk_size=3))
+            self.assertFalse(factory.accept_stream(BytesIO(b'bbbb'), chunk_size=3))
+            self.assertTrue(factory.accept_stream(StringIO('baab'), chunk_size=3))
+            self.assertFalse(factory.accept_stream(BytesIO(b'ab\nab'), chunk_size=3))
+        for factory in (nfa_factory, nfa_factory.to_bitset(), nfa_factory.to_dfa(lazy=True)):
+            self.assertTrue(factory.accept_stream(BytesIO(b'aaaabab'), chunk_size=2))
+            self.assertFalse(factory.accept_stream(BytesIO(b'aabaaab'), chunk_size=2))
+
+        # the dfa stops reading as soon as it is dead
+        stream = BytesIO(b'abc' + b'b' * 100)
+        self.assertFalse(dfa_factory.compile().accept_stream(stream, chunk_size=4))
+        self.assertEqual(stream.tell(), 4)
+
+        with TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'input')
+            with open(path, 'wb') as file:
+                file.write(b'a' * 1000 + b'bab')
+            self.assertTrue(dfa_factory.compile().accept_file(path, chunk_size=64))
+            self.assertTrue(nfa_factory.accept_file(path, chunk_size=64))
+            with open(path, 'wb'):
+                pass
+            self.assertFalse(dfa_factory.accept_file(path))
+
+    def test_stream_utf8(self):
+        # "é" followed by "ü", both two bytes long in utf-8
+        dfa_factory = DFAFactory(1, [3], DFARuleBook([FARule(1, 'é', 2), FARule(2, 'ü', 3)]))
+        nfa_factory = NFAFactory(1, [3], NFARuleBook([FARule(1, 'é', 2), FARule(2, 'ü', 3)]))
+        data = 'éü'.encode()
+        # a chunk size of 1 and 3 cuts both characters in half
+        for factory in (dfa_factory, dfa_factory.compile(), nfa_factory, nfa_factory.to_bitset(),
+                        nfa_factory.to_dfa(lazy=True)):
+            for chunk_size in (1, 3, 4):
+                self.assertTrue(factory.accept_stream(BytesIO(data), chunk_size=chunk_size))
+            self.assertFalse(factory.accept_stream(BytesIO('éé'.encode()), chunk_size=1))
+            # latin-1 bytes are not the same characters
+            self.assertFalse(factory.accept_stream(BytesIO(data.decode('latin-1').encode()), chunk_size=1))
+            # a character cut off at the end and bytes that are not utf-8 at all are rejected
+            for chunk_size in (1, 3, 4):
+                self.assertFalse(factory.accept_stream(BytesIO(data[:-1]), chunk_size=chunk_size))
+                self.assertFalse(factory.accept_stream(BytesIO(data[:2] + b'\xff' + data[2:]), chunk_size=chunk_size))
+
+        # the same for an ascii alphabet, whose compiled table reads raw bytes
+        ascii_dfa = DFAFactory(1, [2], DFARuleBook([FARule(1, 'a', 1), FARule(1, 'b', 2), FARule(2, 'a', 2)]))
+        ascii_nfa = NFAFactory(1, [2], NFARuleBook([FARule(1, 'a', 1), FARule(1, 'b', 2), FARule(2, 'a', 2)]))
+        for factory in (ascii_dfa, ascii_dfa.compile(), ascii_nfa, ascii_nfa.to_bitset(), ascii_nfa.to_dfa(lazy=True)):
+            self.assertTrue(factory.accept_stream(BytesIO(b'aba')))
+            self.assertFalse(factory.accept_stream(BytesIO(b'ab\xffa')))
+            self.assertFalse(factory.accept_stream(BytesIO(b'ab\xc3'), chunk_size=2))
+
+        with TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'input')
+            with open(path, 'wb') as file:
+                file.write(data)
+            self.assertTrue(dfa_factory.compile().accept_file(path, chunk_size=1))
+            self.assertTrue(nfa_factory.accept_file(path, chunk_size=3))
+
+    def test_minimize(self):
+        # states 2 and 4 are equivalent, 5 is unreachable
+        dfa_factory = DFAFactory(1, [3], DFARuleBook(
+            [
+                FARule(1, 'a', 2),
+                FARule(1, 'b', 4),
+
+                FARule(2, 'a', 2),
+                FARule(2, 'b', 3),
+
+                FARule(4, 'a', 2),
+                FARule(4, 'b', 3),
+
+                FARule(3, 'a', 3),
+                FARule(3, 'b', 3),
+
+                FARule(5, 'a', 3),
+            ]
+        ))
+        minimal_factory, report = dfa_factory.minimize()
+        self.assertEqual(report.states_before, 5)
+        self.assertEqual(report.states_after, 3)
+        self.assertEqual(report.states_removed, 2)
+        self.assertEqual(report.rules_removed, 3)
+        for string in ('a', 'b', 'ab', 'bb', 'aab', 'bba', ''):
+            self.assertEqual(minimal_factory.accept(string), dfa_factory.accept(string))
+
+        # the determinized nfa for "third character from the end is b" is already minimal
+        nfa_factory = NFAFactory(1, [4], NFARuleBook(
+            [
+                FARule(1, 'a', 1),
+                FARule(1, 'b', 1),
+                FARule(1, 'b', 2),
+
+                FARule(2, 'a', 3),
+                FARule(2, 'b', 3),
+
+                FARule(3, 'a', 4),
+                FARule(3, 'b', 4),
+            ]
+        ))
+        minimal_factory, report = nfa_factory.to_dfa().compile().minimize()
+        self.assertEqual((report.states_before, report.states_after), (8, 8))
+        minimal_factory, report = nfa_factory.to_dfa(lazy=True).minimize()
+        self.assertEqual((report.states_removed, report.rules_removed), (0, 0))
+        for string in ('bab', 'bbbbb', 'bbabb', 'ab'):
+            self.assertEqual(minimal_factory.accept(string), bool(nfa_factory.accept(string)))
+
+        # a dfa which can never accept collapses into its start state
+        minimal_factory, report = DFAFactory(1, [3], DFARuleBook([FARule(1, 'a', 2), FARule(2, 'a', 1)])).minimize()
+        self.assertEqual(minimal_factory.rulebook.rules, [])
+        self.assertEqual(report.states_after, 0)
+        self.assertFalse(minimal_factory.accept('aa'))
+
+    def test_free_moves(self):
+        # accepts a number of "a" which is a multiple of two or three
+        rulebook = NFARuleBook(
+            [
+                FARule(1, None, 2),
+                FARule(1, None, 4),
+
+                FARule(2, 'a', 3),
+                FARule(3, 'a', 2),
+
+                FARule(4, 'a', 5),
+                FARule(5, 'a', 6),
+                FARule(6, 'a', 4),
+            ]
+        )
+        self.assertEqual(rulebook.follow_free_moves({1}), {1, 2, 4})
+        self.assertEqual(rulebook.next_states({2, 4}, 'a'), {3, 5})
+        self.assertEqual(rulebook.alphabet(), ['a'])
+
+        nfa_factory = NFAFactory(1, [2, 4], rulebook)
+        self.assertEqual(nfa_factory.get_dfa().current_states, {1, 2, 4})
+        for factory in (nfa_factory, nfa_factory.to_bitset(), nfa_factory.to_dfa(), nfa_factory.to_dfa(lazy=True)):
+            self.assertTrue(factory.accept('aa'))
+            self.assertTrue(factory.accept('aaa'))
+            self.assertFalse(factory.accept('aaaaa'))
+            self.assertTrue(factory.accept('aaaaaa'))
+
+        # the cached closures follow added free moves
+        rulebook.add_rule(FARule(3, None, 1))
+        self.assertEqual(rulebook.next_states({2}, 'a'), {1, 2, 3, 4})
@@ -0,0 +1,38 @@
+from unittest import TestCase
+
+from model import big_step, small_step, vm
+from model.big_step import Number, Add, Multiply, LessThan, Variable, Assign, IF, Boolean, Sequence, While, \
+    DoNothing
+
+
+class TestVM(TestCase):
+
+    def test_expression(self):
+        program = vm.compile(LessThan(Add(Variable('x'), Number(2)), Multiply(Variable('y'), Number(1))))
+        self.assertEqual(repr(program.run({'x': Number(2), 'y': Number(5)})), '<True>')
+        self.assertEqual(repr(vm.compile(Number(23)).run()), '<23>')
+
+    def test_statement(self):
+        programs = [
+            (IF(Variable('x'), Assign('y', Number(1)), Assign('y', Number(2))), {'x': Boolean(True)}),
+            (IF(Variable('x'), Assign('y', Number(1)), DoNothing()), {'x': Number(1)}),
+            (Sequence(Assign('x', Add(Number(1), Number(1))), Assign('y', Multiply(Number(2), Variable('x')))), {}),
+            (While(LessThan(Variable('x'), Number(5)), Assign('x', Multiply(Variable('x'), Number(3)))),
+             {'x': Number(1)}),
+            (While(LessThan(Variable('x'), Number(100)),
+                   Sequence(Assign('y', Variable('x')),
+                            Assign('x', Add(Multiply(Variable('x'), Number(2)), Add(Variable('y'), Number(1)))))),
+             {'x': Number(1), 'z': Number(0)}),
+        ]
+        for statement, env in programs:
+            self.assertEqual(repr(vm.compile(statement).run(env)), repr(statement.evaluate(env)))
+
+    def test_small_step(self):
+        statement = small_step.While(
+            small_step.LessThan(small_step.Variable('x'), small_step.Number(5)),
+            small_step.Assign('x', small_step.Multiply(small_step.Variable('x'), small_step.Number(3)))
+        )
+        env = vm.compile(statement).run({'x': small_step.Number(1)})
+        self.assertIsInstance(env['x'], small_step.Number)
+        self.assertEqual(env['x'].value, 9)
+        self.assertNotIsInstance(env['x'], big_step.Number)